@@ -0,0 +1,240 @@
+import datetime
+import functools
+import io
+import logging
+import os
+import random
+import threading
+import time
+import typing
+
+import app.clients
+
+
+# Client for API-Football with a pooled keep-alive session, quota tracking from
+# the rate-limit response headers, exponential backoff and a circuit breaker per
+# caller-supplied key (one per league). Responses are parsed straight off the
+# socket; an optional short-lived response cache keyed by request trades that
+# bounded memory for free repeats and is off by default.
+
+
+class ApiFootballError(Exception):
+    pass
+
+
+class QuotaExhaustedError(ApiFootballError):
+    pass
+
+
+quota: dict[str, int | float | None] = {
+    "daily_limit": None,
+    "daily_remaining": None,
+    "minute_limit": None,
+    "minute_remaining": None,
+    "updated_at": None,
+}
+circuit_failures: dict[str, int] = {}
+circuit_open_until: dict[str, float] = {}
+# Request key -> (expires at, ETag, body)
+response_cache: dict[tuple, tuple[float, str | None, bytes]] = {}
+client_lock = threading.Lock()
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@functools.lru_cache(maxsize=1)
+def get_session():
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY"),
+            "X-RapidAPI-Host": os.getenv("RAPIDAPI_BASE_URL"),
+        }
+    )
+    return session
+
+
+def update_quota(headers: typing.Mapping[str, str]) -> None:
+    header_mapping = {
+        "x-ratelimit-requests-limit": "daily_limit",
+        "x-ratelimit-requests-remaining": "daily_remaining",
+        "x-ratelimit-limit": "minute_limit",
+        "x-ratelimit-remaining": "minute_remaining",
+    }
+    with client_lock:
+        for header, key in header_mapping.items():
+            # requests headers are case-insensitive
+            if headers.get(header) is not None:
+                quota[key] = int(headers[header])
+        quota["updated_at"] = time.time()
+
+
+def check_quota() -> None:
+    # The daily quota resets at midnight UTC, after which the next response
+    # refreshes the remaining count
+    with client_lock:
+        daily_remaining = quota["daily_remaining"]
+        updated_at = quota["updated_at"]
+    if daily_remaining != 0:
+        return
+    last_reset = datetime.datetime.now(datetime.timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if updated_at < last_reset.timestamp():
+        return
+    raise QuotaExhaustedError("API-Football daily request quota is exhausted")
+
+
+def check_circuit(circuit_key: str) -> None:
+    with client_lock:
+        open_until = circuit_open_until.get(circuit_key, 0)
+    if open_until > time.time():
+        raise ApiFootballError(
+            f"Circuit for {circuit_key} is open for another {open_until - time.time():.0f}s"
+        )
+
+
+def record_result(circuit_key: str, succeeded: bool) -> None:
+    config = app.clients.get_config()
+    with client_lock:
+        if succeeded:
+            circuit_failures.pop(circuit_key, None)
+            circuit_open_until.pop(circuit_key, None)
+            return
+        circuit_failures[circuit_key] = circuit_failures.get(circuit_key, 0) + 1
+        if circuit_failures[circuit_key] >= config.getint(
+            "api_football", "circuit_failure_threshold", fallback=3
+        ):
+            circuit_open_until[circuit_key] = time.time() + config.getint(
+                "api_football", "circuit_cooldown_seconds", fallback=300
+            )
+            logging.warning(f"Opened API-Football circuit for {circuit_key}")
+
+
+def send_request(path: str, params: dict, headers: dict, stream: bool):
+    # Retries connection errors, rate limiting and server errors with jittered
+    # exponential backoff, honouring Retry-After when the API sends it
+    import requests
+
+    config = app.clients.get_config()
+    max_retries = config.getint("api_football", "max_retries", fallback=3)
+    backoff_seconds = config.getfloat("api_football", "backoff_seconds", fallback=1)
+    request_url = f"{os.getenv('RAPIDAPI_SCHEME', 'https')}://{os.getenv('RAPIDAPI_BASE_URL')}{path}"
+    for attempt in range(max_retries + 1):
+        check_quota()
+        retry_after = None
+        try:
+            response = get_session().get(
+                url=request_url,
+                params=params,
+                headers=headers,
+                timeout=config.getfloat("api_football", "timeout_seconds", fallback=30),
+                stream=stream,
+            )
+            update_quota(response.headers)
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                return response
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+            error = ApiFootballError(f"API-Football responded with {response.status_code}")
+        except requests.ConnectionError as e:
+            error = e
+        except requests.Timeout as e:
+            error = e
+        if attempt == max_retries:
+            raise ApiFootballError(f"Giving up on {path} after {attempt + 1} attempts: {error}")
+        delay = backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        logging.warning(f"Retrying {path} in {delay:.1f}s: {error}")
+        time.sleep(delay)
+
+
+def parse_response_items(source: typing.BinaryIO) -> typing.Iterator[dict]:
+    # Yields the items of the "response" array one at a time. API-Football
+    # reports quota and key errors as a 200 with an empty "response" and a
+    # non-empty "errors" field, which is raised rather than read as no items.
+    import ijson
+
+    builder = None
+    for prefix, event, value in ijson.parse(source, use_float=True):
+        if prefix == "errors" or prefix.startswith("errors."):
+            root_prefix = "errors"
+        elif prefix == "response.item" or prefix.startswith("response.item."):
+            root_prefix = "response.item"
+        else:
+            continue
+        if builder is None:
+            builder = ijson.ObjectBuilder()
+        builder.event(event, value)
+        if prefix != root_prefix or event in ("start_map", "start_array", "map_key"):
+            continue
+        if root_prefix == "errors":
+            if builder.value:
+                raise ApiFootballError(f"API-Football responded with errors: {builder.value}")
+        else:
+            yield builder.value
+        builder = None
+
+
+def iterate_response_items(
+    path: str, params: dict, circuit_key: str | None = None
+) -> typing.Iterator[dict]:
+    # With caching disabled the body is parsed straight off the socket, so
+    # peak memory is bounded by the caller's chunk size; otherwise only the
+    # raw bytes are kept, which are much smaller than the parsed tree.
+    circuit_key = circuit_key or path
+    check_quota()
+    check_circuit(circuit_key)
+    cache_seconds = app.clients.get_config().getint(
+        "api_football", "response_cache_seconds", fallback=0
+    )
+    cache_key = (path, tuple(sorted((key, str(value)) for key, value in params.items())))
+    with client_lock:
+        expires_at, etag, cached_body = response_cache.get(cache_key, (0, None, b""))
+    if cached_body and expires_at > time.time():
+        yield from parse_response_items(io.BytesIO(cached_body))
+        return
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        response = send_request(path, params, headers, stream=cache_seconds <= 0)
+    except QuotaExhaustedError:
+        # Not a fault of this circuit, every league would trip at once
+        raise
+    except Exception:
+        record_result(circuit_key, succeeded=False)
+        raise
+    with response:
+        try:
+            if response.status_code == 304:
+                body = cached_body
+            elif cache_seconds <= 0:
+                response.raw.decode_content = True
+                yield from parse_response_items(response.raw)
+                record_result(circuit_key, succeeded=True)
+                return
+            else:
+                body = response.content
+        except Exception:
+            record_result(circuit_key, succeeded=False)
+            raise
+    try:
+        yield from parse_response_items(io.BytesIO(body))
+    except Exception:
+        record_result(circuit_key, succeeded=False)
+        raise
+    # Only cache bodies that parsed cleanly
+    with client_lock:
+        response_cache[cache_key] = (time.time() + cache_seconds, response.headers.get("ETag"), body)
+    record_result(circuit_key, succeeded=True)
+
+
+def get_quota() -> dict:
+    with client_lock:
+        return dict(quota)
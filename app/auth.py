@@ -1,30 +1,17 @@
 import gotrue.errors
-import supabase
 
 import functools
+import hmac
 import jwt
 import os
 
+import app.clients
 import app.handlers
 
 
-if not os.getenv("SUPABASE_ADMIN_KEY") or not os.getenv("SUPABASE_URL"):
-    raise ValueError("SUPABASE_ADMIN_KEY and SUPABASE_URL must be set in environment variables")
-supabase_admin_client = supabase.create_client(
-    supabase_key=os.getenv("SUPABASE_ADMIN_KEY"),
-    supabase_url=os.getenv("SUPABASE_URL"),
-)
-if not os.getenv("SUPABASE_ANON_KEY") or not os.getenv("SUPABASE_URL"):
-    raise ValueError("SUPABASE_ANON_KEY and SUPABASE_URL must be set in environment variables")
-supabase_public_client = supabase.create_client(
-    supabase_key=os.getenv("SUPABASE_ANON_KEY"),
-    supabase_url=os.getenv("SUPABASE_URL"),
-)
-
-
 @functools.lru_cache(maxsize=1)
 def list_users():
-    return supabase_admin_client.auth.admin.list_users()
+    return app.clients.get_admin_client().auth.admin.list_users()
 
 
 def check_user_session(access_token: str) -> str:
@@ -40,7 +27,7 @@ def check_user_session(access_token: str) -> str:
         user_id = decoded_token["sub"]
     else:
         # If user is attempting to recover their password
-        response = supabase_public_client.auth.verify_otp(
+        response = app.clients.get_public_client().auth.verify_otp(
             {
                 "token_hash": access_token,
                 "type": "recovery",
@@ -50,6 +37,18 @@ def check_user_session(access_token: str) -> str:
     return user_id
 
 
+def check_admin_secret(admin_secret: str | None) -> None:
+    # Guards admin writes that are not safe to leave open to cron callers.
+    # Without ADMIN_SECRET set they are refused outright.
+    expected_admin_secret = os.environ.get("ADMIN_SECRET")
+    if (
+        not expected_admin_secret
+        or not admin_secret
+        or not hmac.compare_digest(admin_secret.encode(), expected_admin_secret.encode())
+    ):
+        raise ValueError("Invalid admin secret")
+
+
 def signup(email: str, username: str, password: str):
     # 1. Local formatting validation
     if "@" not in email or "." not in email:
@@ -66,7 +65,7 @@ def signup(email: str, username: str, password: str):
             raise ValueError("Username is already taken")
     # 3. Network call
     try:
-        supabase_public_client.auth.sign_up(
+        app.clients.get_public_client().auth.sign_up(
             {
                 "email": email,
                 "password": password,
@@ -75,6 +74,7 @@ def signup(email: str, username: str, password: str):
         )
         # Invalidate caches to reflect the new user system-wide
         list_users.cache_clear()
+        app.handlers.calculate_user_scores.cache_clear()
         app.handlers.calculate_current_standings.cache_clear()
         app.handlers.get_matches_handler.cache_clear() 
     except gotrue.errors.AuthApiError as e:
@@ -83,7 +83,7 @@ def signup(email: str, username: str, password: str):
 
 def login(email: str, password: str) -> str:
     try:
-        login_response = supabase_public_client.auth.sign_in_with_password(
+        login_response = app.clients.get_public_client().auth.sign_in_with_password(
             {"email": email, "password": password}
         )
         access_token = login_response.session.access_token
@@ -93,13 +93,13 @@ def login(email: str, password: str) -> str:
 
 
 def send_password_reset_request(email: str):
-    supabase_public_client.auth.reset_password_email(
+    app.clients.get_public_client().auth.reset_password_email(
         email=email
     )
 
 
 def change_password(user_id: str, password: str):
-    change_password_response = supabase_admin_client.auth.admin.update_user_by_id(
+    change_password_response = app.clients.get_admin_client().auth.admin.update_user_by_id(
         uid=user_id, attributes={"password": password}
     )
     print(change_password_response.model_dump())
@@ -117,12 +117,14 @@ def update_username(user_id: str, new_username: str):
                 raise ValueError("New username is the same as current username")
             raise ValueError("Username is already taken")
     # Proceed with network call
-    supabase_admin_client.auth.admin.update_user_by_id(
+    app.clients.get_admin_client().auth.admin.update_user_by_id(
         uid=user_id, attributes={"user_metadata": {"username": cleaned_new_username}}
     )
     list_users.cache_clear()
+    app.handlers.calculate_user_scores.cache_clear()
     app.handlers.calculate_current_standings.cache_clear()
     app.handlers.get_matches_handler.cache_clear()
+    app.handlers.get_rank_timeline_handler.cache_clear()
 
 
 def update_email(user_id: str, new_email: str):
@@ -136,7 +138,7 @@ def update_email(user_id: str, new_email: str):
                 raise ValueError("New email is the same as current email")
             raise ValueError("Email is already taken")
     # Proceed with network call
-    supabase_admin_client.auth.admin.update_user_by_id(
+    app.clients.get_admin_client().auth.admin.update_user_by_id(
         uid=user_id, attributes={"email": cleaned_new_email}
     )
     list_users.cache_clear()
\ No newline at end of file
@@ -0,0 +1,180 @@
+import postgrest.types
+
+import datetime
+import logging
+import threading
+import uuid
+
+import app.clients
+import app.handlers
+import app.projection
+import app.scheduler
+
+
+# Imports whole league-seasons outside the request cycle. Each chunk of
+# fixtures is written with one idempotent bulk upsert and followed by a
+# checkpoint. A job interrupted by a restart re-imports its season when it is
+# submitted again, and completed seasons are skipped unless forced. Job status
+# is kept per worker; the checkpoints table holds the progress of every import
+# across workers.
+
+backfill_jobs: dict[str, dict] = {}
+backfill_jobs_lock = threading.Lock()
+
+
+def backfill_checkpoints_table():
+    return app.clients.get_table("backfill_checkpoints_table")
+
+
+def get_or_create_league(league_id: int, season: int, name: str, update_matches: bool) -> dict:
+    # The unique (league_id, season) constraint makes concurrent backfills of
+    # the same season share one row; an existing row keeps its name and flags
+    created_leagues = (
+        app.handlers.leagues_table().upsert(
+            {
+                "league_id": league_id,
+                "season": season,
+                "name": name,
+                "update_matches": update_matches,
+            },
+            on_conflict="league_id,season",
+            ignore_duplicates=True,
+        )
+        .execute()
+        .data
+    )
+    if created_leagues:
+        return created_leagues[0]
+    return (
+        app.handlers.leagues_table().select("*")
+        .eq("league_id", league_id)
+        .eq("season", season)
+        .execute()
+        .data[0]
+    )
+
+
+def get_checkpoint(league_id: int, season: int) -> dict:
+    checkpoints = (
+        backfill_checkpoints_table().select("*")
+        .eq("league_id", league_id)
+        .eq("season", season)
+        .execute()
+        .data
+    )
+    if checkpoints:
+        return checkpoints[0]
+    return {"league_id": league_id, "season": season, "fixtures_imported": 0, "completed_at": None}
+
+
+def save_checkpoint(league_id: int, season: int, fixtures_imported: int, completed: bool = False) -> None:
+    backfill_checkpoints_table().upsert(
+        {
+            "league_id": league_id,
+            "season": season,
+            "fixtures_imported": fixtures_imported,
+            "completed_at": datetime.datetime.now(datetime.timezone.utc).isoformat() if completed else None,
+        },
+        on_conflict="league_id,season",
+        returning=postgrest.types.ReturnMethod.minimal,
+    ).execute()
+
+
+def import_league_season(job_league: dict, force: bool) -> None:
+    league_id = job_league["league_id"]
+    season = job_league["season"]
+    league = get_or_create_league(
+        league_id, season, job_league["name"], job_league["update_matches"]
+    )
+    checkpoint = get_checkpoint(league_id, season)
+    if checkpoint["completed_at"] and not force:
+        job_league["fixtures_imported"] = checkpoint["fixtures_imported"]
+        job_league["status"] = "completed"
+        return
+    chunk_size = app.clients.get_config().getint("backfill", "chunk_size", fallback=200)
+    fixtures_seen = 0
+    job_league["status"] = "running"
+    for fixtures_chunk in app.handlers.download_fixtures_for_league(
+        league_id=league_id, season=season, chunk_size=chunk_size
+    ):
+        # API-Football does not promise a stable order, so a resumed import
+        # re-upserts every chunk rather than skipping a count of fixtures
+        fixtures_seen += len(fixtures_chunk)
+        app.handlers.stamp_points_recorded_at(fixtures_chunk)
+        for fixture in fixtures_chunk:
+            fixture["league_id"] = league["id"]
+        app.handlers.matches_table().upsert(
+            fixtures_chunk, on_conflict="id", returning=postgrest.types.ReturnMethod.minimal
+        ).execute()
+        for fixture in fixtures_chunk:
+            if fixture["can_users_place_bets"]:
+                app.scheduler.schedule_kickoff(
+                    match_id=fixture["id"],
+                    start_time=datetime.datetime.fromisoformat(fixture["start_time"]),
+                )
+        save_checkpoint(league_id, season, fixtures_seen)
+        job_league["fixtures_imported"] = fixtures_seen
+    save_checkpoint(league_id, season, fixtures_seen, completed=True)
+    job_league["status"] = "completed"
+
+
+def run_backfill(job_id: str, force: bool) -> None:
+    job = backfill_jobs[job_id]
+    job["status"] = "running"
+    for job_league in job["leagues"]:
+        try:
+            import_league_season(job_league, force)
+        except Exception as e:
+            logging.exception(e)
+            job_league["status"] = "failed"
+            job_league["error"] = str(e)
+    job["status"] = (
+        "failed" if any(job_league["status"] == "failed" for job_league in job["leagues"]) else "completed"
+    )
+    job["finished_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    app.handlers.get_matches_handler.cache_clear()
+    app.handlers.calculate_user_scores.cache_clear()
+    app.handlers.calculate_current_standings.cache_clear()
+    app.handlers.get_finished_matches_count_handler.cache_clear()
+    app.projection.get_remaining_matches_and_bets.cache_clear()
+
+
+def start_backfill(league_seasons: list[dict], force: bool = False) -> str:
+    if not league_seasons:
+        raise ValueError("At least one league season must be given")
+    job_leagues = []
+    for league_season in league_seasons:
+        if "league_id" not in league_season or "season" not in league_season:
+            raise ValueError("Each league season needs a league_id and a season")
+        job_leagues.append(
+            {
+                "league_id": int(league_season["league_id"]),
+                "season": int(league_season["season"]),
+                "name": league_season.get("name") or f"League {league_season['league_id']}",
+                "update_matches": bool(league_season.get("update_matches", True)),
+                "status": "pending",
+                "fixtures_imported": 0,
+                "error": None,
+            }
+        )
+    job_id = str(uuid.uuid4())
+    with backfill_jobs_lock:
+        backfill_jobs[job_id] = {
+            "job_id": job_id,
+            "status": "pending",
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "finished_at": None,
+            "leagues": job_leagues,
+        }
+    threading.Thread(
+        target=run_backfill, args=(job_id, force), name=f"backfill-{job_id}", daemon=True
+    ).start()
+    return job_id
+
+
+def get_backfill_job(job_id: str) -> dict | None:
+    return backfill_jobs.get(job_id)
+
+
+def list_backfill_checkpoints() -> list[dict]:
+    return backfill_checkpoints_table().select("*").order("updated_at", desc=True).execute().data
@@ -0,0 +1,52 @@
+import dotenv
+
+import configparser
+import functools
+import logging
+import os
+
+
+# Clients are created on first use rather than at import time so that worker
+# boot only pays for the modules it needs. The admin client is shared by the
+# auth and handlers modules, so both reuse the same HTTP connection pools.
+
+
+@functools.lru_cache(maxsize=1)
+def load_environment() -> None:
+    dotenv.load_dotenv(dotenv.find_dotenv())
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    return config
+
+
+def _create_client(key_name: str):
+    import supabase
+
+    load_environment()
+    if not os.getenv(key_name) or not os.getenv("SUPABASE_URL"):
+        raise ValueError(f"{key_name} and SUPABASE_URL must be set in environment variables")
+    logging.info(f"Creating Supabase client using {key_name}")
+    return supabase.create_client(
+        supabase_key=os.getenv(key_name),
+        supabase_url=os.getenv("SUPABASE_URL"),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_admin_client():
+    return _create_client("SUPABASE_ADMIN_KEY")
+
+
+@functools.lru_cache(maxsize=1)
+def get_public_client():
+    return _create_client("SUPABASE_ANON_KEY")
+
+
+@functools.lru_cache(maxsize=None)
+def get_table(config_key: str):
+    table_name = get_config().get("database", config_key)
+    return get_admin_client().table(table_name=table_name)
@@ -1,61 +1,83 @@
 import postgrest.exceptions
-import supabase
-import requests
-import dotenv
-import bs4
+import postgrest.types
 
-import configparser
+import csv
+import dataclasses
 import functools
+import io
+import json
 import datetime
-import hashlib
 import logging
-import os
+import threading
+import time
+import typing
+import uuid
 
+import app.api_football
 import app.auth
+import app.clients
+import app.models
+import app.projection
+import app.scheduler
+
+
+scheduled_match_statuses = ["NS", "TBD", "PST"]
+regular_time_match_statuses = ["1H", "HT", "2H"]
+extra_time_match_statuses = ["ET", "BT", "P", "INT"]
+special_match_statuses = ["INT"]
+ongoing_match_statuses = (
+    regular_time_match_statuses + extra_time_match_statuses + special_match_statuses
+)
+finished_in_regular_time_match_statuses = ["FT"]
+finished_in_extra_time_match_statuses = ["AET", "PEN"]
+finished_match_statuses = (
+    finished_in_regular_time_match_statuses + finished_in_extra_time_match_statuses
+)
+# user_id -> bets, keyed by user so a bet change only evicts its owner
+user_bets_cache: dict[str, list[app.models.Bet]] = {}
+user_bets_cache_lock = threading.Lock()
+# group_id -> member ids, and group_id -> (shared scores ranked, standings)
+group_member_ids_cache: dict[str, frozenset[str]] = {}
+group_standings_cache: dict[str, tuple[list, tuple]] = {}
+group_caches_lock = threading.Lock()
+
+
+def bets_table():
+    return app.clients.get_table("bets_table")
+
+
+def leagues_table():
+    return app.clients.get_table("leagues_table")
+
+
+def matches_table():
+    return app.clients.get_table("matches_table")
+
+
+def double_points_table():
+    return app.clients.get_table("double_points_table")
+
+
+def match_links_table():
+    return app.clients.get_table("match_links_table")
+
+
+def groups_table():
+    return app.clients.get_table("groups_table")
 
-try:
-    dotenv.load_dotenv(dotenv.find_dotenv())
-    config = configparser.ConfigParser()
-    config.read("config.ini")
-    supabase_client = supabase.create_client(
-        supabase_key=os.getenv("SUPABASE_ADMIN_KEY"),
-        supabase_url=os.getenv("SUPABASE_URL"),
-    )
-    bets_table = supabase_client.table(
-        table_name=config.get("database", "bets_table"))
-    leagues_table = supabase_client.table(
-        table_name=config.get("database", "leagues_table")
-    )
-    matches_table = supabase_client.table(
-        table_name=config.get("database", "matches_table")
-    )
-    double_points_table = supabase_client.table(
-        table_name=config.get("database", "double_points_table")
-    )
-    match_links_table = supabase_client.table(
-        table_name="matchLinks"
-    )
-    scheduled_match_statuses = ["NS", "TBD", "PST"]
-    regular_time_match_statuses = ["1H", "HT", "2H"]
-    extra_time_match_statuses = ["ET", "BT", "P", "INT"]
-    special_match_statuses = ["INT"]
-    ongoing_match_statuses = (
-        regular_time_match_statuses + extra_time_match_statuses + special_match_statuses
-    )
-    finished_in_regular_time_match_statuses = ["FT"]
-    finished_in_extra_time_match_statuses = ["AET", "PEN"]
-    finished_match_statuses = (
-        finished_in_regular_time_match_statuses + finished_in_extra_time_match_statuses
-    )
-except Exception as e:
-    logging.error(f"Error setting up database connection: {e}")
-    raise e
+
+def group_members_table():
+    return app.clients.get_table("group_members_table")
+
+
+def points_history_table():
+    return app.clients.get_table("points_history_table")
 
 
 @functools.lru_cache(maxsize=1)
 def get_finished_matches_count_handler() -> int:
     response = (
-        matches_table.select("id", count="exact")
+        matches_table().select("id", count="exact")
         .eq("show", True)
         .in_("status", finished_match_statuses)
         .execute()
@@ -78,14 +100,14 @@ def insert_bet(
     }
     try:
         # Insert the bet
-        response = bets_table.upsert(
+        response = bets_table().upsert(
             bet_data, on_conflict="match_id,user_id").execute()
         bet_id = response.data[0]["id"]
         # Calculate how many double points the user has used on other bets
-        MAX_NUMBER_DOUBLE_POINTS = config.getint(
+        MAX_NUMBER_DOUBLE_POINTS = app.clients.get_config().getint(
             "default", "max_number_wildcards")
         current_double_points = (
-            double_points_table.select("bet_id").eq(
+            double_points_table().select("bet_id").eq(
                 "user_id", user_id).execute().data
         )
         num_double_points_used = len(
@@ -93,7 +115,7 @@ def insert_bet(
         )
         if use_double_points and num_double_points_used >= MAX_NUMBER_DOUBLE_POINTS:
             # Delete the bet that was just inserted/updated to keep data consistent
-            bets_table.delete().eq("id", response.data[0]["id"]).execute()
+            bets_table().delete().eq("id", response.data[0]["id"]).execute()
             # Return an error
             raise ValueError(
                 f"You have already used your maximum of {MAX_NUMBER_DOUBLE_POINTS} double points."
@@ -102,19 +124,20 @@ def insert_bet(
         if use_double_points and not any(
             dp for dp in current_double_points if dp["bet_id"] == bet_id
         ):
-            double_points_table.upsert(
+            double_points_table().upsert(
                 {"bet_id": bet_id, "user_id": user_id}, on_conflict="bet_id,user_id"
             ).execute()
         elif not use_double_points and any(
             dp for dp in current_double_points if dp["bet_id"] == bet_id
         ):
             # Check if there is an existing double points entry for this bet, if so, delete it
-            double_points_table.delete().eq("bet_id", bet_id).eq(
+            double_points_table().delete().eq("bet_id", bet_id).eq(
                 "user_id", user_id
             ).execute()
-        # Clear the cache for get_user_bets_handler when a bet is inserted
-        get_user_bets_handler.cache_clear()
-        calculate_current_standings.cache_clear()
+        # Only this user's bets changed. Bets can only be placed before kickoff
+        # and scores ignore matches that have not started, so standings stay cached.
+        evict_user_bets(user_id)
+        app.projection.get_remaining_matches_and_bets.cache_clear()
         return {
             **response.data[0],
             "use_double_points": use_double_points,
@@ -124,96 +147,144 @@ def insert_bet(
         raise ValueError(exception_message)
 
 
-def upsert_fixtures(force: bool = False) -> list[dict]:
-    def process_fixture(fixture: dict) -> dict:
-        fixture_status = fixture["fixture"]["status"]["short"]
-        match_start_time = datetime.datetime.fromisoformat(
-            fixture["fixture"]["date"])
-        # Users can only place bets if the match is scheduled and the start time is in the future
-        if (fixture_status not in scheduled_match_statuses) or (
-            fixture_status in scheduled_match_statuses
-            and match_start_time <= datetime.datetime.now(datetime.timezone.utc)
-        ):
-            can_users_place_bets = False
+def process_fixture(fixture: dict) -> dict:
+    fixture_status = fixture["fixture"]["status"]["short"]
+    match_start_time = datetime.datetime.fromisoformat(
+        fixture["fixture"]["date"])
+    # Users can only place bets if the match is scheduled and the start time is in the future
+    if (fixture_status not in scheduled_match_statuses) or (
+        fixture_status in scheduled_match_statuses
+        and match_start_time <= datetime.datetime.now(datetime.timezone.utc)
+    ):
+        can_users_place_bets = False
+    else:
+        can_users_place_bets = True
+    return {
+        "id": fixture["fixture"]["id"],
+        "start_time": fixture["fixture"]["date"],
+        "status": fixture_status,
+        "can_users_place_bets": can_users_place_bets,
+        "home_team_name": fixture["teams"]["home"]["name"],
+        "away_team_name": fixture["teams"]["away"]["name"],
+        "home_team_logo_url": fixture["teams"]["home"]["logo"],
+        "away_team_logo_url": fixture["teams"]["away"]["logo"],
+        "home_team_goals": fixture["goals"]["home"],
+        "away_team_goals": fixture["goals"]["away"],
+    }
+
+
+def download_fixtures_for_league(
+    league_id: str, season: str, chunk_size: int = 100
+) -> typing.Iterator[list[dict]]:
+    # Parses the response body incrementally and yields processed fixtures in
+    # chunks, so peak memory depends on chunk_size rather than season length
+    query_params = {
+        "league": league_id,
+        "season": season,
+    }
+    processed_fixtures = []
+    for fixture in app.api_football.iterate_response_items(
+        "/v3/fixtures", query_params, circuit_key=f"league:{league_id}"
+    ):
+        processed_fixtures.append(process_fixture(fixture))
+        if len(processed_fixtures) >= chunk_size:
+            yield processed_fixtures
+            processed_fixtures = []
+    if processed_fixtures:
+        yield processed_fixtures
+
+
+def stamp_points_recorded_at(fixtures: list[dict]) -> None:
+    # Matches that had already finished when they were first imported carry no
+    # bets, and leaving them unrecorded would append a whole past season to the
+    # points ledger after the current one. Matches already in the table keep
+    # their stamp, and every row gets the column so the bulk upsert never nulls it.
+    existing_points_recorded_at = {
+        match["id"]: match["points_recorded_at"]
+        for match in matches_table().select("id, points_recorded_at")
+        .in_("id", [fixture["id"] for fixture in fixtures])
+        .execute()
+        .data
+    }
+    imported_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    for fixture in fixtures:
+        if fixture["id"] in existing_points_recorded_at:
+            fixture["points_recorded_at"] = existing_points_recorded_at[fixture["id"]]
+        elif fixture["status"] in finished_match_statuses:
+            fixture["points_recorded_at"] = imported_at
         else:
-            can_users_place_bets = True
-        return {
-            "id": fixture["fixture"]["id"],
-            "start_time": fixture["fixture"]["date"],
-            "status": fixture_status,
-            "can_users_place_bets": can_users_place_bets,
-            "home_team_name": fixture["teams"]["home"]["name"],
-            "away_team_name": fixture["teams"]["away"]["name"],
-            "home_team_logo_url": fixture["teams"]["home"]["logo"],
-            "away_team_logo_url": fixture["teams"]["away"]["logo"],
-            "home_team_goals": fixture["goals"]["home"],
-            "away_team_goals": fixture["goals"]["away"],
-        }
+            fixture["points_recorded_at"] = None
 
-    def download_fixtures_for_league(league_id: str, season: str):
-        request_url = f"https://{os.getenv('RAPIDAPI_BASE_URL')}/v3/fixtures"
-        request_headers = {
-            "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY"),
-            "X-RapidAPI-Host": os.getenv("RAPIDAPI_BASE_URL"),
-        }
-        query_params = {
-            "league": league_id,
-            "season": season,
-        }
-        response = requests.get(
-            url=request_url,
-            headers=request_headers,
-            params=query_params,
-            timeout=30,
-        )
-        response_data = response.json()["response"]
-        processed_fixtures = [process_fixture(
-            fixture) for fixture in response_data]
-        return processed_fixtures
 
+def upsert_fixtures(
+    force: bool = False,
+    download_fixtures: typing.Callable[..., typing.Iterator[list[dict]]] = download_fixtures_for_league,
+) -> list[dict]:
     # Get a list of all of the leagues we are tracking
-    tracked_leagues = leagues_table.select(
+    tracked_leagues = leagues_table().select(
         "*").eq("update_matches", True).execute()
     # If not Force, we only want to download fixtures if there are ongoing matches
     if not force:
-        previously_downloaded_fixtures = matches_table.select(
-            "*").execute().data
         # Check if there are any ongoing matches, e.g. matches that have status in ongoing_match_statuses or matches that are scheduled to start now
-        ongoing_matches = [
-            match
-            for match in previously_downloaded_fixtures
-            if match["status"] in ongoing_match_statuses
-            or (
-                match["status"] in scheduled_match_statuses
-                and datetime.datetime.fromisoformat(match["start_time"])
-                <= datetime.datetime.now(datetime.timezone.utc)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ongoing_matches = (
+            matches_table().select("id")
+            .or_(
+                f"status.in.({','.join(ongoing_match_statuses)}),"
+                f"and(status.in.({','.join(scheduled_match_statuses)}),start_time.lte.{now:%Y-%m-%dT%H:%M:%SZ})"
             )
-        ]
+            .execute()
+            .data
+        )
         if len(ongoing_matches) == 0:
             return {
                 "total_fixtures_upserted": 0,
                 "fixture_ids": [],
             }
-    all_upserted_fixtures = []
+    chunk_size = app.clients.get_config().getint(
+        "api_football", "fixture_chunk_size", fallback=100)
+    upserted_fixture_ids = []
+    failed_league_ids = []
     for league in tracked_leagues.data:
-        newly_downloaded_league_fixture = download_fixtures_for_league(
-            league_id=league["league_id"], season=league["season"]
-        )
-        # Add the foreign key to league.id field
-        for fixture in newly_downloaded_league_fixture:
-            fixture["league_id"] = league["id"]
-        upsert_response = matches_table.upsert(
-            newly_downloaded_league_fixture, on_conflict="id"
-        ).execute()
-        all_upserted_fixtures.extend(upsert_response.data)
+        # A failing league must not stall the update of the others
+        try:
+            for fixtures_chunk in download_fixtures(
+                league_id=league["league_id"], season=league["season"], chunk_size=chunk_size
+            ):
+                stamp_points_recorded_at(fixtures_chunk)
+                # Add the foreign key to league.id field
+                for fixture in fixtures_chunk:
+                    fixture["league_id"] = league["id"]
+                matches_table().upsert(
+                    fixtures_chunk, on_conflict="id", returning=postgrest.types.ReturnMethod.minimal
+                ).execute()
+                upserted_fixture_ids.extend(fixture["id"] for fixture in fixtures_chunk)
+                # Kickoff times may have moved, make sure betting closes at the latest one
+                for fixture in fixtures_chunk:
+                    if fixture["can_users_place_bets"]:
+                        app.scheduler.schedule_kickoff(
+                            match_id=fixture["id"],
+                            start_time=datetime.datetime.fromisoformat(fixture["start_time"]),
+                        )
+        except Exception as e:
+            logging.error(f"Error updating fixtures for league {league['league_id']}: {e}")
+            failed_league_ids.append(league["league_id"])
     response_data = {
-        "total_fixtures_upserted": len(all_upserted_fixtures),
-        "fixture_ids": [f["id"] for f in all_upserted_fixtures],
+        "total_fixtures_upserted": len(upserted_fixture_ids),
+        "fixture_ids": upserted_fixture_ids,
+        "failed_league_ids": failed_league_ids,
+        "api_quota": app.api_football.get_quota(),
     }
+    try:
+        record_points_history()
+    except Exception as e:
+        logging.exception(e)
     # Clear the cache for get_matches_handler and calculate_current_standings when fixtures are upserted
     get_matches_handler.cache_clear()
+    calculate_user_scores.cache_clear()
     calculate_current_standings.cache_clear()
     get_finished_matches_count_handler.cache_clear()
+    app.projection.get_remaining_matches_and_bets.cache_clear()
     return response_data
 
 
@@ -253,7 +324,8 @@ def calculate_bet_points(
 
 
 @functools.lru_cache(maxsize=1)
-def calculate_current_standings() -> tuple[list[dict], list[dict]]:
+def calculate_user_scores() -> tuple[list[app.models.StandingEntry], list[dict]]:
+    # Scores every user once; group standings only filter and re-rank this result
     def calculate_user_points(matches_and_bets: list[dict]) -> dict[str, int]:
         # Returns a dictionary mapping user_id to points
         user_points_mapping = {}
@@ -312,8 +384,8 @@ def calculate_current_standings() -> tuple[list[dict], list[dict]]:
     n: int = 5,
 ) -> tuple[dict[str, list[int]], list[dict]]:
         # Returns a tuple: (mapping of user_id to points, list of last N match details)
-        # Pre-initialize the mapping for all known users
-        user_points_in_last_n_finished_matches_mapping = {uid: [] for uid in user_ids}
+        # Points are read from the ledger rather than re-scored. Users without a
+        # ledger row for a match missed the bet or joined later and get 0.
         finished_matches = [
             match
             for match in matches_and_bets
@@ -321,35 +393,24 @@ def calculate_current_standings() -> tuple[list[dict], list[dict]]:
         ]
         finished_matches.sort(key=lambda x: x["start_time"], reverse=True)
         last_n_finished_matches = finished_matches[:n]
-        for match in last_n_finished_matches:
-            actual_home_goals = match["home_team_goals"]
-            actual_away_goals = match["away_team_goals"]
-            # Track which users have placed bets in this match using a set for faster lookup
-            users_who_placed_bets_in_match = set()
-            for bet in match.get("bets", []):
-                user_id = bet["user_id"]
-                users_who_placed_bets_in_match.add(user_id)
-                predicted_home_goals = bet["predicted_home_goals"]
-                predicted_away_goals = bet["predicted_away_goals"]
-                points = calculate_bet_points(
-                    predicted_home_goals,
-                    predicted_away_goals,
-                    actual_home_goals,
-                    actual_away_goals,
-                )
-                has_double_points = len(bet.get("doublePoints", [])) > 0
-                if has_double_points:
-                    points *= 2
-                if user_id in user_points_in_last_n_finished_matches_mapping:
-                    user_points_in_last_n_finished_matches_mapping[user_id].append(points)
-            # Assign 0 to users who missed the bet
-            for user_id in user_ids:
-                if user_id not in users_who_placed_bets_in_match:
-                    user_points_in_last_n_finished_matches_mapping[user_id].append(0)
-        # Reverse the lists so that the most recent match is last (chronological order)
-        for user_id in user_points_in_last_n_finished_matches_mapping:
-            user_points_in_last_n_finished_matches_mapping[user_id].reverse()
+        # Chronological order, the most recent match is last
         last_n_finished_matches.reverse()
+        ledger_points_mapping = {}
+        if last_n_finished_matches:
+            for entry in (
+                points_history_table().select("match_id, user_id, points")
+                .in_("match_id", [match["id"] for match in last_n_finished_matches])
+                .execute()
+                .data
+            ):
+                ledger_points_mapping[(entry["match_id"], entry["user_id"])] = entry["points"]
+        user_points_in_last_n_finished_matches_mapping = {
+            user_id: [
+                ledger_points_mapping.get((match["id"], user_id), 0)
+                for match in last_n_finished_matches
+            ]
+            for user_id in user_ids
+        }
         return user_points_in_last_n_finished_matches_mapping, last_n_finished_matches
 
     def calculate_num_double_points_used(matches_and_bets: list[dict]) -> dict[str, int]:
@@ -367,7 +428,7 @@ def calculate_current_standings() -> tuple[list[dict], list[dict]]:
         return user_double_points_mapping
 
     matches_and_bets = (
-        matches_table.select(
+        matches_table().select(
             "id, status, home_team_goals, away_team_goals, home_team_name, away_team_name, start_time, bets(user_id, predicted_home_goals, predicted_away_goals, doublePoints(*))"
         )
         .eq("show", True)
@@ -389,56 +450,396 @@ def calculate_current_standings() -> tuple[list[dict], list[dict]]:
     user_double_points_mapping = calculate_num_double_points_used(
         matches_and_bets)
     # Create the standings list
-    num_double_points_allowed = config.getint(
+    num_double_points_allowed = app.clients.get_config().getint(
         "default", "max_number_wildcards")
     standings = []
     for user_id in user_ids:
         standings.append(
-            {
-                "user_id": user_id,
-                "name": users.get(user_id, "User: " + user_id),
-                "points": user_points_mapping.get(user_id, 0),
-                "potential_points": user_potential_points_mapping.get(user_id, 0),
-                "points_in_last_n_finished_matches": user_points_in_last_n_finished_matches_mapping.get(
+            app.models.StandingEntry(
+                user_id=user_id,
+                name=users.get(user_id, "User: " + user_id),
+                points=user_points_mapping.get(user_id, 0),
+                potential_points=user_potential_points_mapping.get(user_id, 0),
+                points_in_last_n_finished_matches=user_points_in_last_n_finished_matches_mapping.get(
                     user_id, []
                 ),
-                "num_double_points_remaining": num_double_points_allowed - user_double_points_mapping.get(user_id, 0),
-            }
+                num_double_points_remaining=num_double_points_allowed - user_double_points_mapping.get(user_id, 0),
+            )
         )
-    # Rank the standings by total points + potential points
-    standings.sort(
-        key=lambda x: (-(x["points"] + x["potential_points"]), x["name"].lower()), reverse=False)
-    for index, entry in enumerate(standings):
-        entry["rank"] = index + 1
     return standings, last_n_finished_matches
 
 
+def rank_by_points(points_mapping: dict[str, int]) -> dict[str, int]:
+    # Competition ranking: users level on points share a rank and the next rank
+    # skips past them. The leaderboard and the points ledger both rank this way.
+    ranked_points = sorted(points_mapping.values(), reverse=True)
+    rank_by_total = {}
+    for index, points in enumerate(ranked_points):
+        rank_by_total.setdefault(points, index + 1)
+    return {user_id: rank_by_total[points] for user_id, points in points_mapping.items()}
+
+
+def rank_standings(
+    user_scores: list[app.models.StandingEntry],
+) -> list[app.models.StandingEntry]:
+    # Copy the shared entries since each group assigns its own ranks
+    standings = [dataclasses.replace(entry) for entry in user_scores]
+    # Rank the standings by total points + potential points, level users are listed by name
+    rank_mapping = rank_by_points(
+        {entry.user_id: entry.points + entry.potential_points for entry in standings}
+    )
+    for entry in standings:
+        entry.rank = rank_mapping[entry.user_id]
+    standings.sort(key=lambda x: (x.rank, x.name.lower()))
+    return standings
+
+
+@functools.lru_cache(maxsize=1)
+def calculate_current_standings() -> tuple[list[app.models.StandingEntry], list[dict]]:
+    user_scores, last_n_finished_matches = calculate_user_scores()
+    return rank_standings(user_scores), last_n_finished_matches
+
+
+def calculate_group_standings(
+    group_id: str,
+) -> tuple[list[app.models.StandingEntry], list[dict]]:
+    # Cached per group and rebuilt when the shared scores are recomputed, so a
+    # membership change only re-ranks its own group
+    user_scores, last_n_finished_matches = calculate_user_scores()
+    with group_caches_lock:
+        cached_user_scores, cached_standings = group_standings_cache.get(
+            group_id, (None, None)
+        )
+    if cached_user_scores is user_scores:
+        return cached_standings
+    group_member_ids = get_group_member_ids(group_id)
+    group_standings = (
+        rank_standings([entry for entry in user_scores if entry.user_id in group_member_ids]),
+        last_n_finished_matches,
+    )
+    with group_caches_lock:
+        group_standings_cache[group_id] = (user_scores, group_standings)
+    return group_standings
+
+
+def get_group_member_ids(group_id: str) -> frozenset[str]:
+    try:
+        uuid.UUID(group_id)
+    except ValueError:
+        raise ValueError("Unknown group")
+    with group_caches_lock:
+        cached_group_member_ids = group_member_ids_cache.get(group_id)
+    if cached_group_member_ids is not None:
+        return cached_group_member_ids
+    group_members = (
+        group_members_table().select("user_id").eq("group_id", group_id).execute().data
+    )
+    group_member_ids = frozenset(member["user_id"] for member in group_members)
+    with group_caches_lock:
+        group_member_ids_cache[group_id] = group_member_ids
+    return group_member_ids
+
+
+def evict_group(group_id: str | None = None) -> None:
+    # Evicts one group's members and standings, or every group's when no group is given
+    with group_caches_lock:
+        if group_id is None:
+            group_member_ids_cache.clear()
+            group_standings_cache.clear()
+        else:
+            group_member_ids_cache.pop(group_id, None)
+            group_standings_cache.pop(group_id, None)
+
+
+def add_group_member(group_id: str, user_id: str) -> dict:
+    try:
+        response = group_members_table().upsert(
+            {"group_id": group_id, "user_id": user_id}, on_conflict="group_id,user_id"
+        ).execute()
+    except postgrest.exceptions.APIError as e:
+        raise ValueError(e.message)
+    # Only membership changed, so the shared scores stay cached and the group just re-ranks
+    evict_group(group_id)
+    return response.data[0]
+
+
+def remove_group_member(group_id: str, user_id: str) -> None:
+    group_members_table().delete().eq("group_id", group_id).eq("user_id", user_id).execute()
+    evict_group(group_id)
+
+
+def create_group(name: str) -> dict:
+    cleaned_name = name.strip()
+    if not cleaned_name:
+        raise ValueError("Group name cannot be empty")
+    response = groups_table().insert({"name": cleaned_name}).execute()
+    return response.data[0]
+
+
+def record_points_history() -> list[int]:
+    # Appends one row per user to the points ledger for every match that has
+    # finished since the last run, so history reads never re-score the season
+    newly_finished_matches = (
+        matches_table().select(
+            "id, start_time, home_team_goals, away_team_goals, bets(user_id, predicted_home_goals, predicted_away_goals, doublePoints(id))"
+        )
+        .eq("show", True)
+        .in_("status", finished_match_statuses)
+        .is_("points_recorded_at", "null")
+        .order("start_time")
+        .execute()
+        .data
+    )
+    if len(newly_finished_matches) == 0:
+        return []
+    recorded_match_ids = [match["id"] for match in newly_finished_matches]
+    # The most recently appended match outside this batch holds every user's
+    # running total. Rows left by a run that failed before stamping
+    # points_recorded_at belong to this batch, so they are rewritten rather
+    # than counted twice.
+    last_recorded_entry = (
+        points_history_table().select("match_id")
+        .not_.in_("match_id", recorded_match_ids)
+        .order("id", desc=True)
+        .limit(1)
+        .execute()
+        .data
+    )
+    cumulative_points_mapping = {user.id: 0 for user in app.auth.list_users()}
+    if last_recorded_entry:
+        for entry in (
+            points_history_table().select("user_id, cumulative_points")
+            .eq("match_id", last_recorded_entry[0]["match_id"])
+            .execute()
+            .data
+        ):
+            cumulative_points_mapping[entry["user_id"]] = entry["cumulative_points"]
+    history_entries = []
+    for match in newly_finished_matches:
+        match_points_mapping = {}
+        for bet in match.get("bets", []):
+            points = calculate_bet_points(
+                bet["predicted_home_goals"],
+                bet["predicted_away_goals"],
+                match["home_team_goals"],
+                match["away_team_goals"],
+            )
+            if len(bet.get("doublePoints", [])) > 0:
+                points *= 2
+            match_points_mapping[bet["user_id"]] = points
+        for user_id in cumulative_points_mapping:
+            cumulative_points_mapping[user_id] += match_points_mapping.get(user_id, 0)
+        rank_mapping = rank_by_points(cumulative_points_mapping)
+        for user_id, cumulative_points in cumulative_points_mapping.items():
+            history_entries.append(
+                {
+                    "match_id": match["id"],
+                    "match_start_time": match["start_time"],
+                    "user_id": user_id,
+                    "points": match_points_mapping.get(user_id, 0),
+                    "cumulative_points": cumulative_points,
+                    "rank": rank_mapping[user_id],
+                }
+            )
+    if history_entries:
+        points_history_table().upsert(
+            history_entries,
+            on_conflict="match_id,user_id",
+            returning=postgrest.types.ReturnMethod.minimal,
+        ).execute()
+    matches_table().update(
+        {"points_recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat()}
+    ).in_("id", recorded_match_ids).execute()
+    get_points_history_handler.cache_clear()
+    get_rank_timeline_handler.cache_clear()
+    return recorded_match_ids
+
+
 @functools.lru_cache(maxsize=100)
-def get_user_bets_handler(user_id: str) -> list[dict]:
-    user_bets = (
-        bets_table.select("*", "doublePoints(*)").eq("user_id",
-                                                     user_id).execute().data
+def get_points_history_handler(user_id: str) -> list[dict]:
+    return (
+        points_history_table().select(
+            "match_id, match_start_time, points, cumulative_points, rank, matches(home_team_name, away_team_name, home_team_goals, away_team_goals)"
+        )
+        .eq("user_id", user_id)
+        .order("id")
+        .execute()
+        .data
     )
-    processed_user_bets = []
-    for bet in user_bets:
-        use_double_points = len(bet.get("doublePoints", [])) > 0
-        bet.pop("doublePoints", None)
-        processed_user_bets.append(
-            {
-                **bet,
-                "use_double_points": use_double_points,
+
+
+@functools.lru_cache(maxsize=1)
+def get_rank_timeline_handler() -> dict[str, list]:
+    history_entries = (
+        points_history_table().select("match_id, match_start_time, user_id, cumulative_points, rank")
+        .order("id")
+        .execute()
+        .data
+    )
+    users = {
+        user.id: user.user_metadata.get("username") for user in app.auth.list_users()
+    }
+    match_ids = []
+    user_timelines = {}
+    for entry in history_entries:
+        if not match_ids or match_ids[-1] != entry["match_id"]:
+            match_ids.append(entry["match_id"])
+        user_id = entry["user_id"]
+        if user_id not in user_timelines:
+            user_timelines[user_id] = {
+                "user_id": user_id,
+                "name": users.get(user_id, "User: " + user_id),
+                # Users who signed up mid-season have no entries for earlier matches
+                "ranks": [None] * (len(match_ids) - 1),
+                "cumulative_points": [None] * (len(match_ids) - 1),
             }
+        user_timelines[user_id]["ranks"].append(entry["rank"])
+        user_timelines[user_id]["cumulative_points"].append(entry["cumulative_points"])
+    return {
+        "match_ids": match_ids,
+        "users": list(user_timelines.values()),
+    }
+
+
+BET_EXPORT_FIELDNAMES = [
+    "bet_id",
+    "created_at",
+    "updated_at",
+    "user_id",
+    "username",
+    "match_id",
+    "start_time",
+    "status",
+    "home_team_name",
+    "away_team_name",
+    "home_team_goals",
+    "away_team_goals",
+    "predicted_home_goals",
+    "predicted_away_goals",
+    "use_double_points",
+    "points",
+]
+
+
+def iterate_bets_with_results(page_size: int = 1000) -> typing.Iterator[dict]:
+    # Keyset pagination on bets.id keeps each page query cheap and only one page in memory.
+    # Bets on matches that have not started are left out, as in get_matches_handler.
+    users = {
+        user.id: user.user_metadata.get("username") for user in app.auth.list_users()
+    }
+    last_bet_id = 0
+    while True:
+        bets_page = (
+            bets_table().select(
+                "id, created_at, updated_at, match_id, user_id, predicted_home_goals, predicted_away_goals, doublePoints(id), matches!inner(start_time, status, home_team_name, away_team_name, home_team_goals, away_team_goals)"
+            )
+            .not_.in_("matches.status", scheduled_match_statuses)
+            .gt("id", last_bet_id)
+            .order("id")
+            .limit(page_size)
+            .execute()
+            .data
         )
-    return processed_user_bets
+        for bet in bets_page:
+            match = bet["matches"]
+            use_double_points = len(bet.get("doublePoints", [])) > 0
+            points = None
+            if match["status"] in finished_match_statuses:
+                points = calculate_bet_points(
+                    bet["predicted_home_goals"],
+                    bet["predicted_away_goals"],
+                    match["home_team_goals"],
+                    match["away_team_goals"],
+                )
+                if use_double_points:
+                    points *= 2
+            yield {
+                "bet_id": bet["id"],
+                "created_at": bet["created_at"],
+                "updated_at": bet["updated_at"],
+                "user_id": bet["user_id"],
+                "username": users.get(bet["user_id"], "User: " + bet["user_id"]),
+                "match_id": bet["match_id"],
+                "start_time": match["start_time"],
+                "status": match["status"],
+                "home_team_name": match["home_team_name"],
+                "away_team_name": match["away_team_name"],
+                "home_team_goals": match["home_team_goals"],
+                "away_team_goals": match["away_team_goals"],
+                "predicted_home_goals": bet["predicted_home_goals"],
+                "predicted_away_goals": bet["predicted_away_goals"],
+                "use_double_points": use_double_points,
+                "points": points,
+            }
+        if len(bets_page) < page_size:
+            return
+        last_bet_id = bets_page[-1]["id"]
+
+
+def export_bets(export_format: str = "csv") -> typing.Iterator[str]:
+    if export_format not in ("csv", "ndjson"):
+        raise ValueError("Export format must be csv or ndjson")
+    rows = iterate_bets_with_results()
+    if export_format == "ndjson":
+        for row in rows:
+            yield json.dumps(row) + "\n"
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=BET_EXPORT_FIELDNAMES)
+    # The header is written up front so an empty export is still a valid CSV
+    writer.writeheader()
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+
+def warm_up() -> None:
+    # Preloads the user directory and standings so the first request served by
+    # a new worker is a cache hit rather than a full recompute
+    start_time = time.perf_counter()
+    try:
+        app.auth.list_users()
+        calculate_current_standings()
+    except Exception as e:
+        logging.exception(e)
+        return
+    logging.info(f"Warm-up completed in {time.perf_counter() - start_time:.2f}s")
+
+
+def get_user_bets_handler(user_id: str) -> list[app.models.Bet]:
+    with user_bets_cache_lock:
+        cached_user_bets = user_bets_cache.get(user_id)
+    if cached_user_bets is not None:
+        return cached_user_bets
+    user_bets = (
+        bets_table().select("*", "doublePoints(*)").eq("user_id",
+                                                     user_id).execute().data
+    )
+    user_bets = [app.models.Bet.from_row(bet) for bet in user_bets]
+    with user_bets_cache_lock:
+        user_bets_cache[user_id] = user_bets
+    return user_bets
+
+
+def evict_user_bets(user_id: str | None = None) -> None:
+    # Evicts one user's bets, or every user's when no user is given
+    with user_bets_cache_lock:
+        if user_id is None:
+            user_bets_cache.clear()
+        else:
+            user_bets_cache.pop(user_id, None)
 
 
 @functools.lru_cache(maxsize=1)
 def get_matches_handler(
     show_matches_n_days_ahead: int = 7, show_matches_n_days_behind: int = 2
-) -> dict[str, list[dict]]:
+) -> dict[str, list[app.models.Match]]:
     # Only show matches that are in dates between now - show_matches_n_days_behind and now + show_matches_n_days_ahead
     matches_and_bets = (
-        matches_table.select(
+        matches_table().select(
             "*, bets(*, doublePoints(id)), leagues(name), matchLinks(url)")
         .eq("show", True)
         .gte(
@@ -465,114 +866,44 @@ def get_matches_handler(
     }
     # Remove bets from upcoming matches so that users cannot see other users' bets before a match starts
     upcoming_matches = [
-        match
+        app.models.Match.from_row(match)
         for match in matches_and_bets
         if match["status"] in scheduled_match_statuses
     ]
-    for match in upcoming_matches:
-        match.pop("bets", None)
     # Sort upcoming matches by start_time ascending and then alphabetically by home_team_name
-    upcoming_matches.sort(key=lambda x: x["home_team_name"])
-    upcoming_matches.sort(key=lambda x: x["start_time"])
+    upcoming_matches.sort(key=lambda x: x.home_team_name)
+    upcoming_matches.sort(key=lambda x: x.start_time)
     ongoing_matches = [
-        match for match in matches_and_bets if match["status"] in ongoing_match_statuses
+        app.models.Match.from_row(
+            match,
+            bets=[
+                app.models.Bet.from_row(
+                    bet, user_name=users.get(bet["user_id"], "User: " + bet["user_id"])
+                )
+                for bet in match.get("bets", [])
+            ],
+        )
+        for match in matches_and_bets
+        if match["status"] in ongoing_match_statuses
     ]
-    for match in ongoing_matches:
-        if "bets" not in match:
-            continue
-        for bet in match["bets"]:
-            bet["user"] = {"name": users.get(
-                bet["user_id"], "User: " + bet["user_id"])}
     # Sort finished matches by start_time descending
     finished_matches = [
-        match
+        app.models.Match.from_row(
+            {**match, "matchLinks": []},
+            bets=[
+                app.models.Bet.from_row(
+                    bet, user_name=users.get(bet["user_id"], "User: " + bet["user_id"])
+                )
+                for bet in match.get("bets", [])
+            ],
+        )
         for match in matches_and_bets
         if match["status"] in finished_match_statuses
     ]
-    for match in finished_matches:
-        match.pop("matchLinks", None)
-    for match in finished_matches:
-        if "bets" not in match:
-            continue
-        for bet in match["bets"]:
-            bet["user"] = {"name": users.get(
-                bet["user_id"], "User: " + bet["user_id"])}
-    finished_matches.sort(key=lambda x: x["start_time"], reverse=True)
+    finished_matches.sort(key=lambda x: x.start_time, reverse=True)
     return {
         "ongoing": ongoing_matches,
         "upcoming": upcoming_matches,
         "finished": finished_matches,
         "num_finished_matches": get_finished_matches_count_handler(),
     }
-
-# @functools.lru_cache()
-# def get_iframe_url(url: str):
-#     response = requests.get(url)
-#     response_html = bs4.BeautifulSoup(response.text, features="html.parser")
-#     iframe = response_html.find("iframe")
-#     iframe_src = iframe["src"]
-#     return iframe_src
-
-# def upsert_fixture_links():
-#     todays_date = datetime.datetime.today()
-#     tomorrows_date = todays_date + datetime.timedelta(days=1)
-#     todays_upcoming_or_ongoing_matches = (matches_table
-#         .select("*")
-#         .gte("start_time", todays_date.isoformat())
-#         .lt("start_time", tomorrows_date.isoformat())
-#         .in_("status", ongoing_match_statuses+scheduled_match_statuses)
-#         .execute()
-#         .data
-#     )
-#     if len(todays_upcoming_or_ongoing_matches) == 0:
-#         return {
-#             "updated_match_ids": [],
-#         }
-#     response = requests.get("https://www.redditsoccerstreams.name/")
-#     response_html = bs4.BeautifulSoup(response.text, features="html.parser")
-#     matches_and_links = {}
-#     for tr in response_html.find("table").find_all("tr"):
-#         tds = tr.find_all("td")
-#         if len(tds) == 3:
-#             match = tds[1].get_text(strip=True)
-#             match_hash = hashlib.sha256(match.encode()).hexdigest()
-#             team_names = match.split(" vs ", maxsplit=1)
-#             if len(team_names) != 2:
-#                 continue
-#             home_team_name = team_names[0]
-#             away_team_name = team_names[1]
-#             if match_hash not in matches_and_links:
-#                 matches_and_links[match_hash] = {
-#                     "home_team_name": home_team_name,
-#                     "away_team_name": away_team_name,
-#                     "links": [],
-#                 }
-#             link = tds[2].find("a")["href"] if tds[2].find("a") else None
-#             if link is None:
-#                 continue
-#             matches_and_links[match_hash]["links"].append(link)
-#     updated_match_ids = []
-#     for _, details in matches_and_links.items():
-#         home_team_name = details["home_team_name"]
-#         away_team_name = details["away_team_name"]
-#         match_id = None
-#         for match in todays_upcoming_or_ongoing_matches:
-#             if match["home_team_name"] == home_team_name:
-#                 match_id = match["id"]
-#                 break
-#             elif match["away_team_name"] == away_team_name:
-#                 match_id = match["id"]
-#                 break
-#             else:
-#                 continue
-#         if not match_id:
-#             continue
-#         for link in details["links"]:
-#             match_links_table.upsert(
-#                 {"match_id": match_id, "url": link}, on_conflict="match_id,url"
-#             ).execute()
-#         updated_match_ids.append(match_id)
-#     get_matches_handler.cache_clear()
-#     return {
-#         "updated_match_ids": updated_match_ids,
-#     }
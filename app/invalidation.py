@@ -0,0 +1,142 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import app.auth
+import app.clients
+import app.handlers
+import app.projection
+
+
+# Every worker keeps its own in-process caches, so writes made by one worker
+# are broadcast by the notify_cache_changes trigger and applied here by all
+# of them. The writing worker still clears its own caches synchronously.
+# Bet changes only evict their owner's bets, and only rescore the standings
+# when the match has kicked off, which keeps a kickoff rush from forcing a
+# full rescan on every worker for each bet.
+
+
+def get_cache_invalidators() -> dict[str, list]:
+    # Cleared on any change to the table
+    return {
+        "bets": [
+            app.handlers.get_matches_handler,
+            app.projection.get_remaining_matches_and_bets,
+        ],
+        "doublePoints": [
+            app.handlers.get_matches_handler,
+            app.projection.get_remaining_matches_and_bets,
+        ],
+        "matches": [
+            app.handlers.get_matches_handler,
+            app.handlers.calculate_user_scores,
+            app.handlers.calculate_current_standings,
+            app.handlers.get_finished_matches_count_handler,
+            app.projection.get_remaining_matches_and_bets,
+        ],
+        "matchLinks": [
+            app.handlers.get_matches_handler,
+        ],
+        "pointsHistory": [
+            app.handlers.get_points_history_handler,
+            app.handlers.get_rank_timeline_handler,
+        ],
+    }
+
+
+def get_score_invalidators() -> list:
+    # Cleared when a bet on a match that has kicked off changes
+    return [
+        app.handlers.calculate_user_scores,
+        app.handlers.calculate_current_standings,
+    ]
+
+
+def clear_all_caches() -> None:
+    for cached_functions in get_cache_invalidators().values():
+        for cached_function in cached_functions:
+            cached_function.cache_clear()
+    for cached_function in get_score_invalidators():
+        cached_function.cache_clear()
+    app.handlers.evict_user_bets()
+    app.handlers.evict_group()
+    app.auth.list_users.cache_clear()
+
+
+def handle_notification(payload: str) -> None:
+    change = json.loads(payload)
+    table = change.get("table")
+    cached_functions = list(get_cache_invalidators().get(table, []))
+    if table in ("bets", "doublePoints"):
+        app.handlers.evict_user_bets(change.get("user_id"))
+        # Scores ignore matches that have not started. A missing status (the
+        # match or bet is already gone) rescores to be safe.
+        if change.get("match_status") not in app.handlers.scheduled_match_statuses:
+            cached_functions += get_score_invalidators()
+    if table == "groupMembers":
+        app.handlers.evict_group(change.get("group_id"))
+    for cached_function in cached_functions:
+        cached_function.cache_clear()
+    logging.debug(f"Invalidated {len(cached_functions)} caches for change {change}")
+
+
+def check_trigger_channels(connection, channel: str) -> None:
+    # The triggers name their channel in SQL, warn if it drifted from config.ini
+    trigger_definitions = connection.execute(
+        "SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger "
+        "WHERE tgfoid = 'notify_cache_changes'::regproc"
+    ).fetchall()
+    for trigger_name, trigger_definition in trigger_definitions:
+        if f"notify_cache_changes('{channel}')" not in trigger_definition:
+            logging.warning(
+                f"Trigger {trigger_name} does not notify channel {channel}: {trigger_definition}"
+            )
+
+
+def listen_for_changes(database_url: str, channel: str) -> None:
+    import psycopg
+
+    retry_delay_seconds = 1
+    while True:
+        try:
+            with psycopg.connect(database_url, autocommit=True) as connection:
+                connection.execute(f"LISTEN {channel}")
+                logging.info(f"Listening for cache invalidations on channel {channel}")
+                retry_delay_seconds = 1
+                try:
+                    check_trigger_channels(connection, channel)
+                except Exception as e:
+                    logging.warning(f"Could not check the cache invalidation triggers: {e}")
+                # Anything may have changed while we were disconnected
+                clear_all_caches()
+                for notification in connection.notifies():
+                    try:
+                        handle_notification(notification.payload)
+                    except Exception as e:
+                        logging.exception(e)
+        except Exception as e:
+            logging.error(f"Cache invalidation listener disconnected: {e}")
+        time.sleep(retry_delay_seconds)
+        retry_delay_seconds = min(retry_delay_seconds * 2, 60)
+
+
+@functools.lru_cache(maxsize=1)
+def start_listener() -> bool:
+    # Requires a direct Postgres connection, PostgREST cannot LISTEN
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logging.info("DATABASE_URL is not set, cross-worker cache invalidation is disabled")
+        return False
+    channel = app.clients.get_config().get(
+        "database", "notify_channel", fallback="cache_changes"
+    )
+    threading.Thread(
+        target=listen_for_changes,
+        args=(database_url, channel),
+        name="cache-invalidation-listener",
+        daemon=True,
+    ).start()
+    return True
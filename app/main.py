@@ -1,26 +1,65 @@
+import time
+
+boot_started_at = time.perf_counter()
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-import dotenv
 
+import contextlib
 import logging
+import threading
 
-dotenv.load_dotenv(dotenv.find_dotenv())
+from app import clients
 
-from app.routers import app_router, auth_router, admin_router
+clients.load_environment()
+
+from app.routers import app_router, auth_router, admin_router, preload_templates
+from app import handlers, invalidation, scheduler
 
 logging.basicConfig(level=logging.INFO)
-app = FastAPI(title="FastAPI Application", version="1.0.0")
+logging.info(f"Application modules imported in {time.perf_counter() - boot_started_at:.2f}s")
+first_response_served = False
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI):
+    invalidation.start_listener()
+    scheduler.start_kickoff_scheduler()
+    preload_templates()
+    if clients.get_config().getboolean("startup", "warm_up", fallback=True):
+        threading.Thread(target=handlers.warm_up, name="warm-up", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="FastAPI Application", version="1.0.0", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 @app.middleware("http")
 async def add_cache_control_header(request: Request, call_next):
     response = await call_next(request)
-    
+
     if request.url.path.startswith("/static/"):
         response.headers["Cache-Control"] = "no-cache, must-revalidate"
-        
+
     return response
-  
+
+
+@app.middleware("http")
+async def measure_time_to_first_response(request: Request, call_next):
+    global first_response_served
+    response = await call_next(request)
+    if not first_response_served:
+        first_response_served = True
+        elapsed = time.perf_counter() - boot_started_at
+        budget = clients.get_config().getfloat(
+            "startup", "time_to_first_response_budget_seconds", fallback=5
+        )
+        if elapsed > budget:
+            logging.warning(f"Time to first response {elapsed:.2f}s exceeded budget of {budget:.2f}s")
+        else:
+            logging.info(f"Time to first response {elapsed:.2f}s")
+    return response
+
 app.include_router(app_router, tags=["Application"])
 app.include_router(auth_router, tags=["Authentication"])
 app.include_router(admin_router, prefix="/admin", tags=["Admin"])
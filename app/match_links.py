@@ -0,0 +1,171 @@
+import concurrent.futures
+import datetime
+import functools
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+import app.clients
+import app.handlers
+
+
+# Scrapes stream links for today's matches. Sources are fetched concurrently,
+# fixtures are matched on both team names through a normalized index, and all
+# links are written in a single bulk upsert. Parsing and matching are pure
+# functions so they can be exercised against saved HTML.
+
+TEAM_NAME_STOP_WORDS = {"fc", "cf", "afc", "sc", "ac", "the", "club", "de"}
+# URL -> (expires at, iframe src)
+iframe_url_cache: dict[str, tuple[float, str]] = {}
+iframe_url_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def get_session():
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=16))
+    session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return session
+
+
+def normalize_team_name(team_name: str) -> str:
+    ascii_name = (
+        unicodedata.normalize("NFKD", team_name).encode("ascii", "ignore").decode("ascii")
+    )
+    words = re.sub(r"[^a-z0-9 ]", " ", ascii_name.lower()).split()
+    return " ".join(word for word in words if word not in TEAM_NAME_STOP_WORDS)
+
+
+def parse_match_links(html: str) -> dict[tuple[str, str], list[str]]:
+    # Maps (home team name, away team name) as written by the source to its links
+    import bs4
+
+    response_html = bs4.BeautifulSoup(html, features="html.parser")
+    matches_and_links = {}
+    table = response_html.find("table")
+    if table is None:
+        return matches_and_links
+    for tr in table.find_all("tr"):
+        tds = tr.find_all("td")
+        if len(tds) != 3:
+            continue
+        team_names = tds[1].get_text(strip=True).split(" vs ", maxsplit=1)
+        if len(team_names) != 2:
+            continue
+        link = tds[2].find("a")
+        if link is None or not link.get("href"):
+            continue
+        key = (team_names[0].strip(), team_names[1].strip())
+        matches_and_links.setdefault(key, []).append(link["href"])
+    return matches_and_links
+
+
+def match_fixture_links(
+    matches_and_links: dict[tuple[str, str], list[str]], matches: list[dict]
+) -> list[dict]:
+    # Both team names have to agree, matching on either one alone links the
+    # wrong fixture whenever a team name is shared across competitions
+    match_index = {
+        (
+            normalize_team_name(match["home_team_name"]),
+            normalize_team_name(match["away_team_name"] or ""),
+        ): match["id"]
+        for match in matches
+    }
+    match_links = {}
+    for (home_team_name, away_team_name), links in matches_and_links.items():
+        match_id = match_index.get(
+            (normalize_team_name(home_team_name), normalize_team_name(away_team_name))
+        )
+        if match_id is None:
+            continue
+        for link in links:
+            match_links[(match_id, link)] = {"match_id": match_id, "url": link}
+    return list(match_links.values())
+
+
+def fetch_source(url: str) -> str:
+    response = get_session().get(url, timeout=15)
+    response.raise_for_status()
+    return response.text
+
+
+def get_todays_upcoming_or_ongoing_matches() -> list[dict]:
+    todays_date = datetime.datetime.now(datetime.timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    tomorrows_date = todays_date + datetime.timedelta(days=1)
+    return (
+        app.handlers.matches_table().select("id, home_team_name, away_team_name")
+        .gte("start_time", todays_date.isoformat())
+        .lt("start_time", tomorrows_date.isoformat())
+        .in_(
+            "status",
+            app.handlers.ongoing_match_statuses + app.handlers.scheduled_match_statuses,
+        )
+        .execute()
+        .data
+    )
+
+
+def upsert_fixture_links() -> dict[str, list[int]]:
+    todays_upcoming_or_ongoing_matches = get_todays_upcoming_or_ongoing_matches()
+    if len(todays_upcoming_or_ongoing_matches) == 0:
+        return {
+            "updated_match_ids": [],
+        }
+    source_urls = [
+        url.strip()
+        for url in app.clients.get_config().get("match_links", "source_urls").split(",")
+        if url.strip()
+    ]
+    matches_and_links = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(source_urls))) as executor:
+        futures = {executor.submit(fetch_source, url): url for url in source_urls}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                source_links = parse_match_links(future.result())
+            except Exception as e:
+                logging.error(f"Error scraping match links from {futures[future]}: {e}")
+                continue
+            for key, links in source_links.items():
+                matches_and_links.setdefault(key, []).extend(links)
+    match_links = match_fixture_links(matches_and_links, todays_upcoming_or_ongoing_matches)
+    if match_links:
+        app.handlers.match_links_table().upsert(
+            match_links, on_conflict="match_id,url"
+        ).execute()
+        app.handlers.get_matches_handler.cache_clear()
+    return {
+        "updated_match_ids": sorted({link["match_id"] for link in match_links}),
+    }
+
+
+def is_known_match_link(url: str) -> bool:
+    return bool(app.handlers.match_links_table().select("id").eq("url", url).limit(1).execute().data)
+
+
+def get_iframe_url(url: str) -> str | None:
+    import bs4
+
+    with iframe_url_cache_lock:
+        expires_at, iframe_src = iframe_url_cache.get(url, (0, None))
+    if expires_at > time.time():
+        return iframe_src
+    # Only resolve links we scraped ourselves rather than fetching arbitrary URLs
+    if not is_known_match_link(url):
+        raise ValueError("Unknown match link")
+    response_html = bs4.BeautifulSoup(fetch_source(url), features="html.parser")
+    iframe = response_html.find("iframe")
+    iframe_src = iframe["src"] if iframe is not None else None
+    cache_seconds = app.clients.get_config().getint(
+        "match_links", "iframe_cache_seconds", fallback=300
+    )
+    with iframe_url_cache_lock:
+        iframe_url_cache[url] = (time.time() + cache_seconds, iframe_src)
+    return iframe_src
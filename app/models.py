@@ -0,0 +1,81 @@
+import dataclasses
+
+
+# Slotted dataclasses replace the nested PostgREST dicts that used to be passed
+# between layers. They drop the per-object __dict__ and are serialized natively
+# by orjson, bypassing FastAPI's generic jsonable_encoder.
+
+
+@dataclasses.dataclass(slots=True)
+class Bet:
+    id: int
+    match_id: int
+    user_id: str
+    predicted_home_goals: int
+    predicted_away_goals: int
+    use_double_points: bool = False
+    user_name: str | None = None
+    created_at: str | None = None
+    updated_at: str | None = None
+
+    @classmethod
+    def from_row(cls, row: dict, user_name: str | None = None) -> "Bet":
+        return cls(
+            id=row["id"],
+            match_id=row["match_id"],
+            user_id=row["user_id"],
+            predicted_home_goals=row["predicted_home_goals"],
+            predicted_away_goals=row["predicted_away_goals"],
+            use_double_points=len(row.get("doublePoints") or []) > 0,
+            user_name=user_name,
+            created_at=row.get("created_at"),
+            updated_at=row.get("updated_at"),
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class Match:
+    id: int
+    start_time: str
+    status: str
+    show: bool
+    can_users_place_bets: bool
+    home_team_name: str
+    away_team_name: str | None
+    home_team_logo_url: str
+    away_team_logo_url: str
+    home_team_goals: int | None
+    away_team_goals: int | None
+    league_name: str | None = None
+    match_links: list[str] = dataclasses.field(default_factory=list)
+    bets: list[Bet] | None = None
+
+    @classmethod
+    def from_row(cls, row: dict, bets: list[Bet] | None = None) -> "Match":
+        return cls(
+            id=row["id"],
+            start_time=row["start_time"],
+            status=row["status"],
+            show=row.get("show", True),
+            can_users_place_bets=row["can_users_place_bets"],
+            home_team_name=row["home_team_name"],
+            away_team_name=row["away_team_name"],
+            home_team_logo_url=row["home_team_logo_url"],
+            away_team_logo_url=row["away_team_logo_url"],
+            home_team_goals=row["home_team_goals"],
+            away_team_goals=row["away_team_goals"],
+            league_name=(row.get("leagues") or {}).get("name"),
+            match_links=[link["url"] for link in row.get("matchLinks") or []],
+            bets=bets,
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class StandingEntry:
+    user_id: str
+    name: str
+    points: int
+    potential_points: int
+    points_in_last_n_finished_matches: list[int]
+    num_double_points_remaining: int
+    rank: int = 0
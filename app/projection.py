@@ -0,0 +1,181 @@
+import datetime
+import functools
+
+import app.clients
+import app.handlers
+
+
+# Projects final standings by simulating every remaining and in-play match with
+# an independent Poisson goal model. Simulations are vectorized over matches,
+# bets and runs, and results are cached per match state so repeated requests
+# between goals, kickoffs and bet changes are free.
+
+
+@functools.lru_cache(maxsize=1)
+def get_remaining_matches_and_bets() -> list[dict]:
+    return (
+        app.handlers.matches_table().select(
+            "id, status, start_time, home_team_goals, away_team_goals, bets(user_id, predicted_home_goals, predicted_away_goals, doublePoints(id))"
+        )
+        .eq("show", True)
+        .in_(
+            "status",
+            app.handlers.scheduled_match_statuses + app.handlers.ongoing_match_statuses,
+        )
+        .execute()
+        .data
+    )
+
+
+def estimate_minutes_remaining(status: str, start_time: str) -> int:
+    # The matches table has no elapsed clock, so estimate it from kickoff time
+    minutes_since_kickoff = (
+        datetime.datetime.now(datetime.timezone.utc)
+        - datetime.datetime.fromisoformat(start_time)
+    ).total_seconds() // 60
+    if status in app.handlers.scheduled_match_statuses:
+        return 90
+    if status == "1H":
+        return int(90 - min(45, max(0, minutes_since_kickoff)))
+    if status == "HT":
+        return 45
+    if status == "2H":
+        # Allow for the 15 minute half time break
+        return int(90 - min(90, max(45, minutes_since_kickoff - 15)))
+    if status in ("ET", "BT"):
+        return 15
+    return 0
+
+
+@functools.lru_cache(maxsize=8)
+def simulate_final_ranks(
+    match_states: tuple, current_points: tuple, num_simulations: int
+) -> "numpy.ndarray":
+    # Returns a (num_users, num_users) array of the probability that each user
+    # finishes in each rank, with users ordered as in current_points. Match
+    # states carry minutes remaining in coarse buckets, so the result stays
+    # cached for a few minutes of a live match but still follows the clock.
+    import numpy as np
+
+    config = app.clients.get_config()
+    home_goals_per_match = config.getfloat("projection", "home_goals_per_match", fallback=1.5)
+    away_goals_per_match = config.getfloat("projection", "away_goals_per_match", fallback=1.2)
+    rng = np.random.default_rng(config.getint("projection", "seed", fallback=2024))
+    user_index = {user_id: index for index, (user_id, _) in enumerate(current_points)}
+    num_users = len(current_points)
+    totals = np.repeat(
+        np.array([points for _, points in current_points], dtype=np.int32)[:, None],
+        num_simulations,
+        axis=1,
+    )
+    for _, minutes_remaining, home_goals, away_goals, bets in match_states:
+        bets = [bet for bet in bets if bet[0] in user_index]
+        if not bets:
+            continue
+        simulated_home_goals = home_goals + rng.poisson(
+            home_goals_per_match * minutes_remaining / 90, num_simulations
+        )
+        simulated_away_goals = away_goals + rng.poisson(
+            away_goals_per_match * minutes_remaining / 90, num_simulations
+        )
+        # Score each distinct prediction against each distinct simulated score
+        # once, there are only a handful of each per match, then gather the
+        # points per user and run. Users without a bet point at a row of zeros.
+        predictions, bet_predictions = np.unique(
+            np.array([(bet[1], bet[2], 2 if bet[3] else 1) for bet in bets], dtype=np.int16),
+            axis=0,
+            return_inverse=True,
+        )
+        score_base = int(simulated_away_goals.max()) + 1
+        scores, run_scores = np.unique(
+            simulated_home_goals * score_base + simulated_away_goals, return_inverse=True
+        )
+        predicted_home_goals = predictions[:, 0:1]
+        predicted_away_goals = predictions[:, 1:2]
+        actual_home_goals = (scores // score_base)[None, :]
+        actual_away_goals = (scores % score_base)[None, :]
+        # Same rules as calculate_bet_points, evaluated for every prediction and score at once
+        predicted_difference = predicted_home_goals - predicted_away_goals
+        actual_difference = actual_home_goals - actual_away_goals
+        score_points = np.zeros((len(predictions) + 1, len(scores)), dtype=np.int16)
+        score_points[:-1] = predictions[:, 2:3] * np.where(
+            (predicted_home_goals == actual_home_goals) & (predicted_away_goals == actual_away_goals),
+            5,
+            np.where(
+                predicted_difference == actual_difference,
+                3,
+                np.where(np.sign(predicted_difference) == np.sign(actual_difference), 1, 0),
+            ),
+        )
+        user_predictions = np.full(num_users, len(predictions))
+        user_predictions[[user_index[bet[0]] for bet in bets]] = bet_predictions.ravel()
+        totals += np.take(score_points, run_scores.ravel(), axis=1)[user_predictions]
+    # Competition rank per run: 1 + number of users with strictly more points.
+    # Totals are small integers, so a histogram per run replaces sorting.
+    totals -= totals.min()
+    num_totals = int(totals.max()) + 1
+    run_totals = (
+        totals + np.arange(num_simulations, dtype=np.int64)[None, :] * num_totals
+    ).ravel()
+    totals_histogram = np.bincount(
+        run_totals, minlength=num_simulations * num_totals
+    ).reshape(num_simulations, num_totals)
+    users_ahead = num_users - np.cumsum(totals_histogram, axis=1, dtype=np.int32)
+    ranks = users_ahead.ravel()[run_totals].reshape(num_users, num_simulations) + 1
+    rank_counts = np.bincount(
+        (np.arange(num_users)[:, None] * num_users + ranks - 1).ravel(),
+        minlength=num_users * num_users,
+    ).reshape(num_users, num_users)
+    return rank_counts / num_simulations
+
+
+def calculate_projected_standings() -> list[dict]:
+    import numpy as np
+
+    standings, _ = app.handlers.calculate_current_standings()
+    if not standings:
+        return []
+    minutes_bucket = app.clients.get_config().getint(
+        "projection", "minutes_remaining_bucket", fallback=5
+    )
+    match_states = tuple(
+        (
+            match["id"],
+            minutes_bucket
+            * round(estimate_minutes_remaining(match["status"], match["start_time"]) / minutes_bucket),
+            match["home_team_goals"] or 0,
+            match["away_team_goals"] or 0,
+            tuple(
+                sorted(
+                    (
+                        bet["user_id"],
+                        bet["predicted_home_goals"],
+                        bet["predicted_away_goals"],
+                        len(bet.get("doublePoints") or []) > 0,
+                    )
+                    for bet in match.get("bets", [])
+                )
+            ),
+        )
+        for match in sorted(get_remaining_matches_and_bets(), key=lambda x: x["id"])
+    )
+    current_points = tuple((entry.user_id, entry.points) for entry in standings)
+    num_simulations = app.clients.get_config().getint(
+        "projection", "num_simulations", fallback=10000
+    )
+    rank_probabilities = simulate_final_ranks(match_states, current_points, num_simulations)
+    ranks = np.arange(1, len(standings) + 1)
+    projected_standings = []
+    for index, entry in enumerate(standings):
+        projected_standings.append(
+            {
+                "user_id": entry.user_id,
+                "name": entry.name,
+                "points": entry.points,
+                "expected_rank": round(float(rank_probabilities[index] @ ranks), 2),
+                "probability_first": round(float(rank_probabilities[index][0]), 4),
+                "rank_probabilities": rank_probabilities[index].round(4).tolist(),
+            }
+        )
+    projected_standings.sort(key=lambda x: (x["expected_rank"], x["name"].lower()))
+    return projected_standings
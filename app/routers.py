@@ -1,17 +1,44 @@
-from fastapi import APIRouter, Request, Form, status, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, Header, Request, Form, Query, status, HTTPException
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse
 
 import datetime
 import logging
 
-from app import handlers, auth
+from app import handlers, auth, backfill, match_links, projection
 
 app_router = APIRouter()
 auth_router = APIRouter()
 admin_router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
+# The standings table is identical for every viewer, so it is rendered once per
+# standings version. The standings handlers return a new list whenever they
+# recompute, so the identity of that list is the version.
+standings_table_cache: dict[str | None, tuple[list, str]] = {}
+
+
+def render_standings_table(
+    group_id: str | None, standings: list, last_n_finished_matches: list[dict]
+) -> str:
+    cached_standings, cached_html = standings_table_cache.get(group_id, (None, ""))
+    if cached_standings is standings:
+        return cached_html
+    standings_table_html = templates.get_template("standings-table.html").render(
+        standings=standings,
+        last_n_finished_matches=last_n_finished_matches,
+    )
+    standings_table_cache[group_id] = (standings, standings_table_html)
+    return standings_table_html
+
+
+def preload_templates() -> None:
+    # Compile every template up front and skip per-request modification checks
+    templates.env.auto_reload = False
+    for template_name in templates.env.list_templates():
+        templates.env.get_template(template_name)
+
+
 # Authentication Routes
 
 
@@ -146,20 +173,34 @@ def update_email(request: Request, email: str = Form(...)):
 
 
 @app_router.get("/")
-def read_root(request: Request):
+def read_root(request: Request, group_id: str | None = None):
     access_token = request.cookies.get("access_token", None)
     if not access_token:
         response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
         return response
     try:
-        _ = auth.check_user_session(access_token)
-        league_standings, last_n_finished_matches = handlers.calculate_current_standings()
+        user_id = auth.check_user_session(access_token)
+        try:
+            is_group_member = group_id is None or user_id in handlers.get_group_member_ids(group_id)
+        except ValueError:
+            is_group_member = False
+        if not is_group_member:
+            response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
+            return response
+        if group_id is not None:
+            league_standings, last_n_finished_matches = handlers.calculate_group_standings(
+                group_id
+            )
+        else:
+            league_standings, last_n_finished_matches = handlers.calculate_current_standings()
         response = templates.TemplateResponse(
             request=request,
             name="index.html",
             context={
-                "standings": league_standings,
-                "last_n_finished_matches": last_n_finished_matches,
+                "standings_table": render_standings_table(
+                    group_id, league_standings, last_n_finished_matches
+                ),
+                "current_user_id": user_id,
             },
         )
         return response
@@ -206,7 +247,7 @@ async def get_rules(request: Request):
 @app_router.get("/matches")
 async def get_matches():
     matches = handlers.get_matches_handler()
-    return matches
+    return ORJSONResponse(matches)
 
 
 @app_router.get("/bets")
@@ -218,9 +259,11 @@ async def get_user_bets(request: Request):
     try:
         user_id = auth.check_user_session(access_token)
         user_bets = handlers.get_user_bets_handler(user_id=user_id)
-        return {
-            "bets": user_bets,
-        }
+        return ORJSONResponse(
+            {
+                "bets": user_bets,
+            }
+        )
     except ValueError as e:
         logging.exception(e)
         raise HTTPException(status_code=400, detail=str(e))
@@ -231,6 +274,86 @@ async def get_user_bets(request: Request):
         )
 
 
+@app_router.get("/standings/projection")
+def get_projected_standings(request: Request):
+    access_token = request.cookies.get("access_token", None)
+    if not access_token:
+        response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+        return response
+    try:
+        _ = auth.check_user_session(access_token)
+        projected_standings = projection.calculate_projected_standings()
+        return ORJSONResponse(
+            {
+                "standings": projected_standings,
+            }
+        )
+    except Exception as e:
+        logging.exception(e)
+        raise HTTPException(
+            status_code=500, detail="Something went wrong. Please try again later."
+        )
+
+
+@app_router.get("/groups/{group_id}/standings")
+def get_group_standings(request: Request, group_id: str):
+    access_token = request.cookies.get("access_token", None)
+    if not access_token:
+        response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+        return response
+    user_id = auth.check_user_session(access_token)
+    try:
+        group_member_ids = handlers.get_group_member_ids(group_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if user_id not in group_member_ids:
+        raise HTTPException(status_code=403, detail="You are not a member of this group.")
+    group_standings, _ = handlers.calculate_group_standings(group_id)
+    return ORJSONResponse(
+        {
+            "standings": group_standings,
+        }
+    )
+
+
+@app_router.get("/users/{user_id}/history")
+def get_user_points_history(request: Request, user_id: str):
+    access_token = request.cookies.get("access_token", None)
+    if not access_token:
+        response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+        return response
+    try:
+        _ = auth.check_user_session(access_token)
+        points_history = handlers.get_points_history_handler(user_id=user_id)
+        return ORJSONResponse(
+            {
+                "history": points_history,
+            }
+        )
+    except Exception as e:
+        logging.exception(e)
+        raise HTTPException(
+            status_code=500, detail="Something went wrong. Please try again later."
+        )
+
+
+@app_router.get("/standings/timeline")
+def get_rank_timeline(request: Request):
+    access_token = request.cookies.get("access_token", None)
+    if not access_token:
+        response = RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+        return response
+    try:
+        _ = auth.check_user_session(access_token)
+        rank_timeline = handlers.get_rank_timeline_handler()
+        return ORJSONResponse(rank_timeline)
+    except Exception as e:
+        logging.exception(e)
+        raise HTTPException(
+            status_code=500, detail="Something went wrong. Please try again later."
+        )
+
+
 @app_router.post("/bets")
 def place_bet(
     request: Request,
@@ -261,13 +384,19 @@ def place_bet(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# @app_router.get("/fixtures/links/iframe/source")
-# async def get_iframe_source(url: str):
-#     print(url)
-#     iframe_source = handlers.get_iframe_url(url=url)
-#     return {
-#         "iframeSrc": iframe_source,
-#     }
+@app_router.get("/fixtures/links/iframe/source")
+def get_iframe_source(url: str):
+    try:
+        iframe_source = match_links.get_iframe_url(url=url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.exception(e)
+        raise HTTPException(status_code=502, detail="Could not load the match link.")
+    return {
+        "iframeSrc": iframe_source,
+    }
+
 
 # Admin Routes
 
@@ -279,8 +408,82 @@ def update_fixtures(force: bool = False, request: Request = None):
     return update_response
 
 
-# @admin_router.get("/fixtures/links/update")
-# def update_fixture_links(request: Request = None):
-#     update_response = handlers.upsert_fixture_links()
-#     return update_response
+@admin_router.post("/backfill")
+def start_backfill(league_seasons: list[dict] = Body(...), force: bool = False):
+    # Body: [{"league_id": 39, "season": 2024, "name": "Premier League"}, ...]
+    try:
+        job_id = backfill.start_backfill(league_seasons=league_seasons, force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"job_id": job_id}
+
+
+@admin_router.get("/backfill")
+def list_backfill_progress():
+    return {"checkpoints": backfill.list_backfill_checkpoints()}
+
+
+@admin_router.get("/backfill/{job_id}")
+def get_backfill_status(job_id: str):
+    job = backfill.get_backfill_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown job on this worker, see /admin/backfill for overall progress.",
+        )
+    return job
+
+
+@admin_router.get("/export/bets")
+def export_bets(export_format: str = Query("csv", alias="format")):
+    if export_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Export format must be csv or ndjson")
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        handlers.export_bets(export_format=export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="bets.{export_format}"'},
+    )
+
+
+def require_admin_secret(admin_secret: str | None) -> None:
+    # Group membership decides who sees a private league, so unlike the
+    # idempotent refresh routes these need the admin secret
+    try:
+        auth.check_admin_secret(admin_secret)
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+@admin_router.post("/groups")
+def create_group(name: str = Form(...), x_admin_secret: str | None = Header(None)):
+    require_admin_secret(x_admin_secret)
+    try:
+        return handlers.create_group(name=name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@admin_router.post("/groups/{group_id}/members")
+def add_group_member(
+    group_id: str, user_id: str = Form(...), x_admin_secret: str | None = Header(None)
+):
+    require_admin_secret(x_admin_secret)
+    try:
+        return handlers.add_group_member(group_id=group_id, user_id=user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@admin_router.delete("/groups/{group_id}/members/{user_id}")
+def remove_group_member(group_id: str, user_id: str, x_admin_secret: str | None = Header(None)):
+    require_admin_secret(x_admin_secret)
+    handlers.remove_group_member(group_id=group_id, user_id=user_id)
+    return {"message": "Member removed from group."}
+
 
+@admin_router.get("/fixtures/links/update")
+def update_fixture_links(background_tasks: BackgroundTasks):
+    # Scraping runs after the response is sent so cron callers never time out
+    background_tasks.add_task(match_links.upsert_fixture_links)
+    return {"message": "Fixture links update started."}
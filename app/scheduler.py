@@ -0,0 +1,95 @@
+import datetime
+import functools
+import heapq
+import logging
+import threading
+
+import app.clients
+import app.handlers
+
+
+# Closes betting on each match exactly at its kickoff instead of waiting for the
+# next fixture update to notice that start_time has passed. Kickoffs are kept in
+# a heap served by a single thread; rescheduled matches leave their old entry in
+# the heap, which is skipped when it no longer matches the latest start time.
+kickoff_heap: list[tuple[datetime.datetime, int]] = []
+scheduled_kickoffs: dict[int, datetime.datetime] = {}
+kickoff_condition = threading.Condition()
+
+
+def schedule_kickoff(match_id: int, start_time: datetime.datetime) -> None:
+    with kickoff_condition:
+        if scheduled_kickoffs.get(match_id) == start_time:
+            return
+        scheduled_kickoffs[match_id] = start_time
+        heapq.heappush(kickoff_heap, (start_time, match_id))
+        kickoff_condition.notify()
+
+
+def load_upcoming_kickoffs() -> int:
+    upcoming_matches = (
+        app.handlers.matches_table().select("id, start_time")
+        .eq("can_users_place_bets", True)
+        .in_("status", app.handlers.scheduled_match_statuses)
+        .execute()
+        .data
+    )
+    for match in upcoming_matches:
+        schedule_kickoff(
+            match_id=match["id"],
+            start_time=datetime.datetime.fromisoformat(match["start_time"]),
+        )
+    return len(upcoming_matches)
+
+
+def close_betting(match_id: int) -> None:
+    response = (
+        app.handlers.matches_table().update({"can_users_place_bets": False})
+        .eq("id", match_id)
+        .eq("can_users_place_bets", True)
+        .execute()
+    )
+    # Another worker may already have closed the match
+    if response.data:
+        logging.info(f"Closed betting for match {match_id} at kickoff")
+        app.handlers.get_matches_handler.cache_clear()
+
+
+def run_kickoff_timers() -> None:
+    while True:
+        with kickoff_condition:
+            while True:
+                if not kickoff_heap:
+                    kickoff_condition.wait()
+                    continue
+                start_time, match_id = kickoff_heap[0]
+                seconds_until_kickoff = (
+                    start_time - datetime.datetime.now(datetime.timezone.utc)
+                ).total_seconds()
+                if seconds_until_kickoff > 0:
+                    kickoff_condition.wait(timeout=seconds_until_kickoff)
+                    continue
+                heapq.heappop(kickoff_heap)
+                if scheduled_kickoffs.get(match_id) != start_time:
+                    continue
+                del scheduled_kickoffs[match_id]
+                break
+        try:
+            close_betting(match_id)
+        except Exception as e:
+            logging.exception(e)
+
+
+@functools.lru_cache(maxsize=1)
+def start_kickoff_scheduler() -> bool:
+    if not app.clients.get_config().getboolean(
+        "scheduler", "close_bets_at_kickoff", fallback=True
+    ):
+        return False
+    threading.Thread(target=run_kickoff_timers, name="kickoff-timers", daemon=True).start()
+    try:
+        num_kickoffs = load_upcoming_kickoffs()
+        logging.info(f"Scheduled {num_kickoffs} kickoffs")
+    except Exception as e:
+        logging.exception(e)
+    return True
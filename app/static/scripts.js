@@ -200,8 +200,8 @@ const renderMatchDetails = (matchData, userMatchBet, isOngoing, isUpcoming) => {
   // Show league name if available
   let leagueName = document.createElement("span");
   leagueName.classList.add("league-name");
-  leagueName.innerText = matchData.leagues.name;
-  if (matchData.leagues.name) {
+  leagueName.innerText = matchData.league_name;
+  if (matchData.league_name) {
     fixtureInfo.appendChild(leagueName);
   }
   let fixtureTime = document.createElement("span");
@@ -289,13 +289,13 @@ const renderMatchDetails = (matchData, userMatchBet, isOngoing, isUpcoming) => {
     matchData.bets.forEach((bet) => {
       let betInfo = document.createElement("tr");
       let username = document.createElement("td");
-      username.innerText = bet.user.name;
+      username.innerText = bet.user_name;
       let homeGoals = document.createElement("td");
       homeGoals.innerText = bet.predicted_home_goals;
       let awayGoals = document.createElement("td");
       awayGoals.innerText = bet.predicted_away_goals;
       let pointBoosterEnabled = document.createElement("td");
-      pointBoosterEnabled.innerText = bet.doublePoints.length > 0 ? "Yes" : "No";
+      pointBoosterEnabled.innerText = bet.use_double_points ? "Yes" : "No";
       betInfo.appendChild(username);
       betInfo.appendChild(homeGoals);
       betInfo.appendChild(awayGoals);
@@ -306,7 +306,7 @@ const renderMatchDetails = (matchData, userMatchBet, isOngoing, isUpcoming) => {
     betsInfoContainer.appendChild(betsInfoTable);
     fixtureInfo.appendChild(betsInfoContainer);
   }
-  if (matchData.matchLinks && matchData.matchLinks.length > 0) {
+  if (matchData.match_links && matchData.match_links.length > 0) {
     let showMatchLinksButton = document.createElement("button");
     showMatchLinksButton.innerText = "Show Match Links";
     showMatchLinksButton.classList.add("show-match-links-button");
@@ -330,17 +330,17 @@ const renderMatchDetails = (matchData, userMatchBet, isOngoing, isUpcoming) => {
     matchLinkURLHeader.innerText = "URL";
     matchLinksTableHeader.appendChild(matchLinkURLHeader);
     matchLinksTable.appendChild(matchLinksTableHeader);
-    matchData.matchLinks.forEach((link) => {
+    matchData.match_links.forEach((link) => {
       let linkInfo = document.createElement("tr");
       let urlCell = document.createElement("td");
       let a = document.createElement("a");
       a.href = "#";
-      a.textContent = link.url;
+      a.textContent = link;
       a.onclick = async (e) => {
         e.preventDefault();
         try {
           let res = await fetch(
-            `/fixtures/links/iframe/source?url=${encodeURIComponent(link.url)}`,
+            `/fixtures/links/iframe/source?url=${encodeURIComponent(link)}`,
             { headers: { "accept": "application/json" } }
           );
           if (!res.ok) throw new Error("Failed to fetch iframe source");
@@ -0,0 +1,46 @@
+import tracemalloc
+
+from app.models import Bet
+
+
+# Compares the memory held by a full season of bets as PostgREST dicts versus
+# slotted Bet models. Run from the repository root with:
+#   python -m benchmarks.models_memory
+
+NUM_MATCHES = 380
+NUM_USERS = 40
+
+
+def make_bet_rows() -> list[dict]:
+    return [
+        {
+            "id": match_id * NUM_USERS + user_index,
+            "created_at": "2024-06-14T18:00:00.000000+00:00",
+            "updated_at": None,
+            "match_id": match_id,
+            "user_id": f"00000000-0000-0000-0000-{user_index:012d}",
+            "predicted_home_goals": match_id % 4,
+            "predicted_away_goals": user_index % 3,
+            "doublePoints": [],
+        }
+        for match_id in range(NUM_MATCHES)
+        for user_index in range(NUM_USERS)
+    ]
+
+
+def measure(build) -> tuple[int, object]:
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+if __name__ == "__main__":
+    rows_size, rows = measure(make_bet_rows)
+    models_size, models = measure(lambda: [Bet.from_row(row) for row in make_bet_rows()])
+    num_bets = len(rows)
+    print(f"Bets in season: {num_bets}")
+    print(f"dict rows:  {rows_size / 1024:.0f} KiB ({rows_size / num_bets:.0f} B per bet)")
+    print(f"Bet models: {models_size / 1024:.0f} KiB ({models_size / num_bets:.0f} B per bet)")
+    print(f"Saving per bet: {(rows_size - models_size) / num_bets:.0f} B")
@@ -0,0 +1,47 @@
+import pathlib
+import sys
+
+from app.match_links import match_fixture_links, parse_match_links
+
+
+# Runs the match link scraper offline against a saved source page, so changes
+# to parsing or team name matching can be checked without fetching anything.
+#
+#   python -m loadtest.check_match_links
+
+SAVED_SOURCE_PAGE = pathlib.Path(__file__).parent / "pages" / "match_links_source.html"
+MATCHES = [
+    # Accents are folded
+    {"id": 1, "home_team_name": "Atletico Madrid", "away_team_name": "Real Sociedad"},
+    # Club suffixes like FC are dropped
+    {"id": 2, "home_team_name": "Barcelona", "away_team_name": "Sevilla"},
+    # Different spellings of a name are not guessed at
+    {"id": 3, "home_team_name": "Bayern Munich", "away_team_name": "Borussia Dortmund"},
+    # Sharing one team name with a listed match is not enough
+    {"id": 4, "home_team_name": "Arsenal", "away_team_name": "Chelsea"},
+    # Listed without a link yet
+    {"id": 5, "home_team_name": "Inter", "away_team_name": "Milan"},
+]
+EXPECTED_MATCH_LINKS = [
+    {"match_id": 1, "url": "https://streams.example/watch/atletico-real-sociedad-1"},
+    {"match_id": 1, "url": "https://streams.example/watch/atletico-real-sociedad-2"},
+    {"match_id": 2, "url": "https://streams.example/watch/barcelona-sevilla"},
+]
+
+
+def check_match_links() -> bool:
+    matches_and_links = parse_match_links(SAVED_SOURCE_PAGE.read_text(encoding="utf-8"))
+    match_links = match_fixture_links(matches_and_links, MATCHES)
+    sort_key = lambda x: (x["match_id"], x["url"])
+    missing_links = [link for link in EXPECTED_MATCH_LINKS if link not in match_links]
+    unexpected_links = [link for link in match_links if link not in EXPECTED_MATCH_LINKS]
+    print(f"Parsed {len(matches_and_links)} listed matches, linked {len(match_links)} links")
+    for link in sorted(missing_links, key=sort_key):
+        print(f"missing     {link['match_id']}  {link['url']}")
+    for link in sorted(unexpected_links, key=sort_key):
+        print(f"unexpected  {link['match_id']}  {link['url']}")
+    return not missing_links and not unexpected_links
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_match_links() else 1)
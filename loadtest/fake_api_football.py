@@ -0,0 +1,71 @@
+from fastapi import FastAPI, Response
+import uvicorn
+
+import argparse
+import datetime
+import json
+import os
+import time
+
+from loadtest import timelines
+
+
+# Stand-in for the API-Football /v3/fixtures endpoint. It replays a recorded or
+# synthetic timeline, advancing `speed` timeline minutes per wall clock minute,
+# and returns the rate-limit headers the real API sends.
+#
+#   python -m loadtest.fake_api_football --speed 10 --port 8081
+#
+# Point the app at it with RAPIDAPI_BASE_URL=localhost:8081 RAPIDAPI_SCHEME=http
+
+app = FastAPI(title="Fake API-Football")
+started_at = time.monotonic()
+timeline_frames: list[dict] = []
+speed = 1.0
+requests_served = 0
+
+
+@app.get("/v3/fixtures")
+def get_fixtures(league: str, season: str):
+    global requests_served
+    requests_served += 1
+    minute = (time.monotonic() - started_at) / 60 * speed + timeline_frames[0]["minute"]
+    frame = timelines.frame_at(timeline_frames, minute)
+    body = {
+        "get": "fixtures",
+        "parameters": {"league": league, "season": season},
+        "errors": [],
+        "results": len(frame["fixtures"]),
+        "response": frame["fixtures"],
+    }
+    return Response(
+        content=json.dumps(body),
+        media_type="application/json",
+        headers={
+            "x-ratelimit-requests-limit": "7500",
+            "x-ratelimit-requests-remaining": str(max(0, 7500 - requests_served)),
+            "X-RateLimit-Limit": "300",
+            "X-RateLimit-Remaining": "299",
+        },
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timeline", help="Recorded timeline JSON, synthesized when omitted")
+    parser.add_argument("--matches", type=int, default=10)
+    parser.add_argument("--lead-minutes", type=int, default=5, help="Wall clock minutes before the first kickoff")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8081")))
+    args = parser.parse_args()
+    speed = args.speed
+    if args.timeline:
+        timeline_frames = timelines.load_timeline(args.timeline)
+    else:
+        timeline_frames = timelines.synthesize_timeline(
+            num_matches=args.matches,
+            kickoff=datetime.datetime.now(datetime.timezone.utc)
+            + datetime.timedelta(minutes=args.lead_minutes),
+            lead_minutes=int(args.lead_minutes * speed),
+        )
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
@@ -0,0 +1,129 @@
+import httpx
+
+import argparse
+import collections
+import concurrent.futures
+import random
+import statistics
+import threading
+import time
+
+
+# Scripted user scenarios against a running app, reporting throughput, tail
+# latency and error rate per endpoint.
+#
+#   python -m loadtest.run --scenario kickoff-rush --users 100 --duration 300
+#
+# kickoff-rush: the minutes before kickoff, when most users log in, browse the
+#   matches, place and edit bets and toggle double points.
+# goal-spike: the minute after a goal, when everyone reloads / and /matches.
+
+latencies = collections.defaultdict(list)
+errors = collections.Counter()
+stats_lock = threading.Lock()
+
+
+def timed_request(client: httpx.Client, method: str, path: str, **kwargs) -> httpx.Response | None:
+    endpoint = f"{method} {path}"
+    started_at = time.perf_counter()
+    try:
+        response = client.request(method, path, **kwargs)
+        failed = response.status_code >= 500
+    except httpx.HTTPError:
+        response = None
+        failed = True
+    elapsed = time.perf_counter() - started_at
+    with stats_lock:
+        latencies[endpoint].append(elapsed)
+        if failed:
+            errors[endpoint] += 1
+    return response
+
+
+def login(client: httpx.Client, user_index: int) -> bool:
+    response = timed_request(
+        client,
+        "POST",
+        "/login",
+        data={"email": f"loadtest+{user_index}@example.com", "password": f"password-{user_index}"},
+    )
+    return response is not None and "access_token" in client.cookies
+
+
+def kickoff_rush(client: httpx.Client, rng: random.Random, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        timed_request(client, "GET", "/")
+        matches_response = timed_request(client, "GET", "/matches")
+        timed_request(client, "GET", "/bets")
+        if matches_response is None or matches_response.status_code != 200:
+            continue
+        upcoming_matches = matches_response.json()["upcoming"]
+        if not upcoming_matches:
+            continue
+        match = rng.choice(upcoming_matches)
+        bet = {
+            "fixture_id": match["id"],
+            "home_goals": rng.randint(0, 3),
+            "away_goals": rng.randint(0, 3),
+        }
+        timed_request(client, "POST", "/bets", data=bet)
+        # Users often change their mind and then spend a double points token
+        bet["home_goals"] = rng.randint(0, 3)
+        timed_request(client, "POST", "/bets", data=bet)
+        if rng.random() < 0.3:
+            timed_request(client, "POST", "/bets", data={**bet, "double_points": "true"})
+        time.sleep(rng.uniform(0.5, 2))
+
+
+def goal_spike(client: httpx.Client, rng: random.Random, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        timed_request(client, "GET", "/")
+        timed_request(client, "GET", "/matches")
+        time.sleep(rng.uniform(0.1, 1))
+
+
+SCENARIOS = {
+    "kickoff-rush": kickoff_rush,
+    "goal-spike": goal_spike,
+}
+
+
+def run_user(base_url: str, user_index: int, scenario: str, deadline: float) -> None:
+    rng = random.Random(user_index)
+    with httpx.Client(base_url=base_url, timeout=30, follow_redirects=False) as client:
+        if not login(client, user_index):
+            return
+        SCENARIOS[scenario](client, rng, deadline)
+
+
+def print_report(duration: float) -> None:
+    print(f"{'endpoint':<16}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for endpoint, endpoint_latencies in sorted(latencies.items()):
+        endpoint_latencies.sort()
+        num_requests = len(endpoint_latencies)
+        percentiles = statistics.quantiles(endpoint_latencies, n=100) if num_requests > 1 else endpoint_latencies * 99
+        print(
+            f"{endpoint:<16}{num_requests:>10}{num_requests / duration:>9.1f}"
+            f"{errors[endpoint] / num_requests:>8.1%} "
+            f"{percentiles[49] * 1000:>8.0f} {percentiles[94] * 1000:>8.0f} "
+            f"{percentiles[98] * 1000:>8.0f} {endpoint_latencies[-1] * 1000:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=SCENARIOS.keys(), default="kickoff-rush")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument("--ramp-up", type=float, default=10, help="Seconds to start all users over")
+    args = parser.parse_args()
+    # Load the replayed fixtures so there is something to bet on
+    httpx.get(f"{args.base_url}/admin/fixtures/update", params={"force": True}, timeout=120)
+    started_at = time.monotonic()
+    deadline = started_at + args.ramp_up + args.duration
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.users) as executor:
+        for user_index in range(args.users):
+            executor.submit(run_user, args.base_url, user_index, args.scenario, deadline)
+            time.sleep(args.ramp_up / args.users)
+    print_report(time.monotonic() - started_at)
@@ -0,0 +1,125 @@
+import argparse
+import collections
+import functools
+import os
+import time
+
+import app.handlers
+import app.projection
+from loadtest import timelines
+
+
+# Replays a fixture timeline through upsert_fixtures at accelerated speed, in
+# place of the live API, and reports per tick how many rows were written, which
+# caches were invalidated and how long the standings and matches took to
+# recompute. Run it against the local stand-in from loadtest/docker-compose.yml
+# with the environment printed by loadtest.seed:
+#
+#   python -m loadtest.simulate_matchday --tick-minutes 5
+#
+# Record a real matchday to replay later with --timeline:
+#
+#   python -m loadtest.simulate_matchday --record matchday.json --league 39 --season 2024
+
+
+def replay_downloader(frame: dict):
+    def download_fixtures(league_id: str, season: str, chunk_size: int = 100):
+        processed_fixtures = [
+            app.handlers.process_fixture(fixture) for fixture in frame["fixtures"]
+        ]
+        for index in range(0, len(processed_fixtures), chunk_size):
+            yield processed_fixtures[index:index + chunk_size]
+
+    return download_fixtures
+
+
+def count_cache_invalidations(counter: collections.Counter) -> None:
+    for module in (app.handlers, app.projection):
+        for name, cached_function in vars(module).items():
+            if not isinstance(cached_function, functools._lru_cache_wrapper):
+                continue
+
+            def counting_cache_clear(name=name, cache_clear=cached_function.cache_clear):
+                counter[name] += 1
+                cache_clear()
+
+            cached_function.cache_clear = counting_cache_clear
+
+
+def fixture_state(fixture: dict) -> tuple:
+    return (
+        fixture["fixture"]["status"]["short"],
+        fixture["goals"]["home"],
+        fixture["goals"]["away"],
+    )
+
+
+def simulate(frames: list[dict], tick_minutes: int) -> None:
+    invalidations = collections.Counter()
+    count_cache_invalidations(invalidations)
+    previous_states = {}
+    print(f"{'minute':>6}{'changed':>9}{'written':>9}{'upsert ms':>11}{'recompute ms':>14}  invalidated caches")
+    for frame in frames[::tick_minutes]:
+        invalidations.clear()
+        changed_fixtures = 0
+        for fixture in frame["fixtures"]:
+            fixture_id = fixture["fixture"]["id"]
+            if previous_states.get(fixture_id) != fixture_state(fixture):
+                changed_fixtures += 1
+            previous_states[fixture_id] = fixture_state(fixture)
+        started_at = time.perf_counter()
+        upsert_response = app.handlers.upsert_fixtures(
+            force=True, download_fixtures=replay_downloader(frame)
+        )
+        upsert_time = time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        app.handlers.calculate_current_standings()
+        app.handlers.get_matches_handler()
+        recompute_time = time.perf_counter() - started_at
+        print(
+            f"{frame['minute']:>6}{changed_fixtures:>9}{upsert_response['total_fixtures_upserted']:>9}"
+            f"{upsert_time * 1000:>11.0f}{recompute_time * 1000:>14.0f}  "
+            + ", ".join(f"{name} x{count}" for name, count in sorted(invalidations.items()))
+        )
+
+
+def record(path: str, league_id: str, season: str, tick_minutes: int, num_ticks: int) -> None:
+    # Polls the live API and saves every response as a timeline frame
+    import requests
+
+    frames = []
+    for tick in range(num_ticks):
+        response = requests.get(
+            url=f"https://{os.getenv('RAPIDAPI_BASE_URL')}/v3/fixtures",
+            headers={
+                "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY"),
+                "X-RapidAPI-Host": os.getenv("RAPIDAPI_BASE_URL"),
+            },
+            params={"league": league_id, "season": season},
+            timeout=30,
+        )
+        response.raise_for_status()
+        frames.append({"minute": tick * tick_minutes, "fixtures": response.json()["response"]})
+        timelines.save_timeline(path, frames)
+        time.sleep(tick_minutes * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timeline", help="Recorded timeline JSON, synthesized when omitted")
+    parser.add_argument("--matches", type=int, default=10)
+    parser.add_argument("--tick-minutes", type=int, default=5, help="Polling interval being simulated")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--record", help="Record a live timeline to this path instead of replaying")
+    parser.add_argument("--league")
+    parser.add_argument("--season")
+    parser.add_argument("--ticks", type=int, default=30)
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.league, args.season, args.tick_minutes, args.ticks)
+        raise SystemExit
+    if args.timeline:
+        frames = timelines.load_timeline(args.timeline)
+    else:
+        frames = timelines.synthesize_timeline(num_matches=args.matches, seed=args.seed)
+    simulate(frames, args.tick_minutes)
@@ -0,0 +1,125 @@
+import datetime
+import json
+import random
+
+
+# A timeline is a list of frames, each holding the API-Football /v3/fixtures
+# response items as they looked at `minute` minutes after the first kickoff.
+# Frames can be recorded from the live API or synthesized deterministically.
+
+TEAM_NAMES = [
+    "Arsenal", "Aston Villa", "Bournemouth", "Brentford", "Brighton", "Chelsea",
+    "Crystal Palace", "Everton", "Fulham", "Liverpool", "Manchester City",
+    "Manchester United", "Newcastle", "Nottingham Forest", "Tottenham",
+    "West Ham", "Wolves", "Leicester", "Ipswich", "Southampton",
+]
+
+
+def make_fixture(
+    fixture_id: int,
+    kickoff: datetime.datetime,
+    home_team_name: str,
+    away_team_name: str,
+    status: str,
+    elapsed: int | None,
+    home_goals: int | None,
+    away_goals: int | None,
+) -> dict:
+    return {
+        "fixture": {
+            "id": fixture_id,
+            "date": kickoff.isoformat(),
+            "status": {"short": status, "elapsed": elapsed},
+        },
+        "teams": {
+            "home": {"name": home_team_name, "logo": f"https://media.example/{fixture_id}/home.png"},
+            "away": {"name": away_team_name, "logo": f"https://media.example/{fixture_id}/away.png"},
+        },
+        "goals": {"home": home_goals, "away": away_goals},
+    }
+
+
+def match_state_at(minute: int, goal_minutes: tuple[list[int], list[int]]) -> tuple:
+    # Maps minutes since kickoff to (status, elapsed, home goals, away goals),
+    # with a 15 minute half time break and no stoppage time
+    if minute < 0:
+        return "NS", None, None, None
+    if minute < 45:
+        status, elapsed = "1H", minute
+    elif minute < 60:
+        status, elapsed = "HT", 45
+    elif minute < 105:
+        status, elapsed = "2H", minute - 15
+    else:
+        status, elapsed = "FT", 90
+    home_goals = sum(1 for goal_minute in goal_minutes[0] if goal_minute <= elapsed)
+    away_goals = sum(1 for goal_minute in goal_minutes[1] if goal_minute <= elapsed)
+    return status, elapsed, home_goals, away_goals
+
+
+def synthesize_timeline(
+    num_matches: int = 10,
+    first_fixture_id: int = 900000,
+    kickoff: datetime.datetime | None = None,
+    kickoff_spacing_minutes: int = 0,
+    lead_minutes: int = 5,
+    seed: int = 2024,
+) -> list[dict]:
+    rng = random.Random(seed)
+    kickoff = kickoff or datetime.datetime.now(datetime.timezone.utc).replace(second=0, microsecond=0)
+    matches = []
+    for index in range(num_matches):
+        home_team_name, away_team_name = rng.sample(TEAM_NAMES, 2)
+        goal_minutes = (
+            sorted(rng.randint(1, 90) for _ in range(rng.choice([0, 1, 1, 2, 2, 3, 4]))),
+            sorted(rng.randint(1, 90) for _ in range(rng.choice([0, 0, 1, 1, 2, 3]))),
+        )
+        matches.append(
+            (
+                first_fixture_id + index,
+                index * kickoff_spacing_minutes,
+                home_team_name,
+                away_team_name,
+                goal_minutes,
+            )
+        )
+    last_minute = max(offset for _, offset, _, _, _ in matches) + 106
+    frames = []
+    for minute in range(-lead_minutes, last_minute + 1):
+        fixtures = []
+        for fixture_id, offset, home_team_name, away_team_name, goal_minutes in matches:
+            status, elapsed, home_goals, away_goals = match_state_at(minute - offset, goal_minutes)
+            fixtures.append(
+                make_fixture(
+                    fixture_id,
+                    kickoff + datetime.timedelta(minutes=offset),
+                    home_team_name,
+                    away_team_name,
+                    status,
+                    elapsed,
+                    home_goals,
+                    away_goals,
+                )
+            )
+        frames.append({"minute": minute, "fixtures": fixtures})
+    return frames
+
+
+def load_timeline(path: str) -> list[dict]:
+    with open(path) as timeline_file:
+        return json.load(timeline_file)
+
+
+def save_timeline(path: str, frames: list[dict]) -> None:
+    with open(path, "w") as timeline_file:
+        json.dump(frames, timeline_file)
+
+
+def frame_at(frames: list[dict], minute: float) -> dict:
+    # Latest frame at or before the given minute
+    current_frame = frames[0]
+    for frame in frames:
+        if frame["minute"] > minute:
+            break
+        current_frame = frame
+    return current_frame
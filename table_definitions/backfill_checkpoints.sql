@@ -0,0 +1,15 @@
+create table public."backfillCheckpoints" (
+    id bigint generated by default as identity not null,
+    created_at timestamp with time zone not null default now(),
+    updated_at timestamp with time zone null,
+    league_id smallint not null,
+    season smallint not null,
+    fixtures_imported integer not null default 0,
+    completed_at timestamp with time zone null,
+    constraint backfill_checkpoints_pkey primary key (id),
+    constraint backfill_checkpoints_league_season_unique unique (league_id, season)
+) TABLESPACE pg_default;
+
+create trigger handle_updated_at BEFORE
+update
+    on "backfillCheckpoints" for EACH row execute FUNCTION extensions.moddatetime ('updated_at');
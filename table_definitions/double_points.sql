@@ -0,0 +1,10 @@
+create table public."doublePoints" (
+    id bigint generated by default as identity not null,
+    created_at timestamp with time zone not null default now(),
+    bet_id bigint not null,
+    user_id uuid not null,
+    constraint double_points_pkey primary key (id),
+    constraint double_points_bet_user_unique unique (bet_id, user_id),
+    constraint double_points_bet_id_fkey foreign KEY (bet_id) references bets (id) on update CASCADE on delete CASCADE,
+    constraint double_points_user_id_fkey foreign KEY (user_id) references auth.users (id) on update CASCADE on delete CASCADE
+) TABLESPACE pg_default;
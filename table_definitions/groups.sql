@@ -0,0 +1,24 @@
+create table public.groups (
+    id uuid not null default gen_random_uuid (),
+    created_at timestamp with time zone not null default now(),
+    name text not null,
+    constraint groups_pkey primary key (id)
+) TABLESPACE pg_default;
+
+create table public."groupMembers" (
+    id bigint generated by default as identity not null,
+    created_at timestamp with time zone not null default now(),
+    group_id uuid not null,
+    user_id uuid not null,
+    constraint group_members_pkey primary key (id),
+    constraint group_members_group_user_unique unique (group_id, user_id),
+    constraint group_members_group_id_fkey foreign KEY (group_id) references groups (id) on update CASCADE on delete CASCADE,
+    constraint group_members_user_id_fkey foreign KEY (user_id) references auth.users (id) on update CASCADE on delete CASCADE
+) TABLESPACE pg_default;
+
+create trigger group_members_notify_cache_changes
+after
+insert
+    or
+update
+    or delete on public."groupMembers" for EACH row execute FUNCTION notify_cache_changes ('cache_changes');
@@ -0,0 +1,43 @@
+-- Indexes backing the queries in app/. Unique constraints already cover
+-- bets(match_id, user_id), doublePoints(bet_id, user_id), matchLinks(match_id, url),
+-- pointsHistory(match_id, user_id), groupMembers(group_id, user_id),
+-- leagues(league_id, season) and backfillCheckpoints(league_id, season).
+
+-- get_user_bets_handler, export keyset pagination is served by the primary key
+create index if not exists bets_user_id_idx on public.bets using btree (user_id) TABLESPACE pg_default;
+
+-- insert_bet counts a user's double points
+create index if not exists double_points_user_id_idx on public."doublePoints" using btree (user_id) TABLESPACE pg_default;
+
+-- get_matches_handler, calculate_user_scores and upsert_fixture_links: matches by kickoff time
+create index if not exists matches_start_time_idx on public.matches using btree (start_time) TABLESPACE pg_default;
+
+-- upsert_fixtures and get_remaining_matches_and_bets: matches by status
+create index if not exists matches_status_start_time_idx on public.matches using btree (status, start_time) TABLESPACE pg_default;
+
+-- get_finished_matches_count_handler counts most visible matches from the index alone
+create index if not exists matches_show_status_idx on public.matches using btree (status) include (id) TABLESPACE pg_default
+where
+    show = true;
+
+-- Every embedded bets(...) select reads a match's bets from the index alone
+create index if not exists bets_match_id_covering_idx on public.bets using btree (match_id) include (id, user_id, predicted_home_goals, predicted_away_goals) TABLESPACE pg_default;
+
+-- record_points_history: finished matches not yet written to the ledger
+create index if not exists matches_points_unrecorded_idx on public.matches using btree (start_time) TABLESPACE pg_default
+where
+    points_recorded_at is null;
+
+-- load_upcoming_kickoffs: matches still open for betting
+create index if not exists matches_open_for_bets_idx on public.matches using btree (start_time) TABLESPACE pg_default
+where
+    can_users_place_bets = true;
+
+-- Cascading deletes from leagues
+create index if not exists matches_league_id_idx on public.matches using btree (league_id) TABLESPACE pg_default;
+
+-- get_iframe_url only resolves known links
+create index if not exists match_links_url_idx on public."matchLinks" using btree (url) TABLESPACE pg_default;
+
+-- get_points_history_handler reads one user's ledger in append order
+create index if not exists points_history_user_id_idx on public."pointsHistory" using btree (user_id, id) TABLESPACE pg_default;
@@ -6,7 +6,8 @@ create table public.leagues (
     update_matches boolean not null default true,
     season smallint not null,
     name text not null,
-    constraint leagues_pkey primary key (id)
+    constraint leagues_pkey primary key (id),
+    constraint leagues_league_season_unique unique (league_id, season)
 ) TABLESPACE pg_default;
 
 create trigger handle_updated_at BEFORE
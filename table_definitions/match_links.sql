@@ -0,0 +1,17 @@
+create table public."matchLinks" (
+    id bigint generated by default as identity not null,
+    created_at timestamp with time zone not null default now(),
+    match_id bigint not null,
+    url text not null,
+    constraint match_links_pkey primary key (id),
+    constraint match_links_match_url_unique unique (match_id, url),
+    constraint match_links_match_id_fkey foreign KEY (match_id) references matches (id) on update CASCADE on delete CASCADE
+) TABLESPACE pg_default;
+
+-- Links are written in one bulk upsert per scrape
+create trigger match_links_notify_cache_changes
+after
+insert
+    or
+update
+    or delete on public."matchLinks" for EACH statement execute FUNCTION notify_cache_changes ('cache_changes');
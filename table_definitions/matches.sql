@@ -13,6 +13,7 @@ create table public.matches (
     start_time timestamp with time zone not null default (now() AT TIME ZONE 'utc' :: text),
     can_users_place_bets boolean not null default true,
     league_id uuid not null,
+    points_recorded_at timestamp with time zone null,
     constraint matches_pkey primary key (id),
     constraint matches_league_id_fkey foreign KEY (league_id) references leagues (id) on update CASCADE on delete CASCADE
 ) TABLESPACE pg_default;
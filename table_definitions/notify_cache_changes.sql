@@ -0,0 +1,101 @@
+-- Triggers pass the channel as their only argument, it must match notify_channel in config.ini
+CREATE
+OR REPLACE FUNCTION notify_cache_changes() RETURNS TRIGGER AS $$
+DECLARE
+    changed_row RECORD;
+    changed_match_id BIGINT;
+    changed_match_status TEXT;
+BEGIN -- Statement triggers cover bulk writes, where one notification per row would flood listeners
+IF TG_LEVEL = 'STATEMENT' THEN PERFORM pg_notify(
+    TG_ARGV[0],
+    json_build_object('table', TG_TABLE_NAME) :: text
+);
+
+RETURN NULL;
+
+END IF;
+
+IF TG_OP = 'DELETE' THEN changed_row := OLD;
+ELSE changed_row := NEW;
+END IF;
+
+IF TG_TABLE_NAME = 'matches' THEN changed_match_id := changed_row.id;
+ELSIF TG_TABLE_NAME = 'bets' THEN changed_match_id := changed_row.match_id;
+ELSIF TG_TABLE_NAME = 'doublePoints' THEN
+SELECT
+    b.match_id INTO changed_match_id
+FROM
+    public.bets b
+WHERE
+    b.id = changed_row.bet_id;
+END IF;
+
+-- Listeners skip rescoring for bets on matches that have not kicked off
+IF changed_match_id IS NOT NULL THEN
+SELECT
+    m.status INTO changed_match_status
+FROM
+    public.matches m
+WHERE
+    m.id = changed_match_id;
+END IF;
+
+PERFORM pg_notify(
+    TG_ARGV[0],
+    json_build_object(
+        'table',
+        TG_TABLE_NAME,
+        'id',
+        changed_row.id,
+        'user_id',
+        CASE
+            WHEN TG_TABLE_NAME = 'matches' THEN NULL
+            ELSE to_jsonb(changed_row) ->> 'user_id'
+        END,
+        'match_id',
+        changed_match_id,
+        'match_status',
+        changed_match_status,
+        'group_id',
+        to_jsonb(changed_row) ->> 'group_id'
+    ) :: text
+);
+
+RETURN NULL;
+
+END;
+
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER bets_notify_cache_changes
+AFTER
+INSERT
+    OR
+UPDATE
+    OR DELETE ON public.bets FOR EACH ROW EXECUTE FUNCTION notify_cache_changes('cache_changes');
+
+CREATE TRIGGER double_points_notify_cache_changes
+AFTER
+INSERT
+    OR
+UPDATE
+    OR DELETE ON public."doublePoints" FOR EACH ROW EXECUTE FUNCTION notify_cache_changes('cache_changes');
+
+-- Fixture upserts rewrite every row of a season, so only notify when a column the caches depend on changes
+CREATE TRIGGER matches_notify_cache_changes
+AFTER
+UPDATE
+    ON public.matches FOR EACH ROW
+    WHEN (
+        OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.home_team_goals IS DISTINCT FROM NEW.home_team_goals
+        OR OLD.away_team_goals IS DISTINCT FROM NEW.away_team_goals
+        OR OLD.can_users_place_bets IS DISTINCT FROM NEW.can_users_place_bets
+        OR OLD.start_time IS DISTINCT FROM NEW.start_time
+        OR OLD.show IS DISTINCT FROM NEW.show
+    ) EXECUTE FUNCTION notify_cache_changes('cache_changes');
+
+CREATE TRIGGER matches_insert_delete_notify_cache_changes
+AFTER
+INSERT
+    OR DELETE ON public.matches FOR EACH ROW EXECUTE FUNCTION notify_cache_changes('cache_changes');
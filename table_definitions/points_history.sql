@@ -0,0 +1,22 @@
+create table public."pointsHistory" (
+    id bigint generated by default as identity not null,
+    created_at timestamp with time zone not null default now(),
+    match_id bigint not null,
+    match_start_time timestamp with time zone not null,
+    user_id uuid not null,
+    points smallint not null,
+    cumulative_points integer not null,
+    rank smallint not null,
+    constraint points_history_pkey primary key (id),
+    constraint points_history_match_user_unique unique (match_id, user_id),
+    constraint points_history_match_id_fkey foreign KEY (match_id) references matches (id) on update CASCADE on delete CASCADE,
+    constraint points_history_user_id_fkey foreign KEY (user_id) references auth.users (id) on update CASCADE on delete CASCADE
+) TABLESPACE pg_default;
+
+-- The ledger is written one batch of matches per statement
+create trigger points_history_notify_cache_changes
+after
+insert
+    or
+update
+    or delete on public."pointsHistory" for EACH statement execute FUNCTION notify_cache_changes ('cache_changes');
@@ -7,6 +7,7 @@ OR REPLACE FUNCTION prevent_bets_when_closed() RETURNS TRIGGER AS $ $ BEGIN IF N
     WHERE
         m.id = NEW.match_id
         AND m.can_users_place_bets = true
+        AND m.start_time > now()
 ) THEN RAISE EXCEPTION 'User cannot place a bet on this fixture';
 
 END IF;